@@ -0,0 +1,894 @@
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import re
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import zlib
+from datetime import date, datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pandas as pd
+
+from github_data_dive.search import SearchIndex
+
+
+# Benchmarks for the explorer's data paths, run against synthetic GitHub-shaped data.
+# Usage:
+#   python benchmark.py search --rows 10000 100000 1000000 [--database-url postgresql+psycopg2://...]
+#   python benchmark.py pipeline --rows 1000 100000 1000000 [--database-url postgresql+psycopg2://...]
+#   python benchmark.py memory --rows 1000 10000 50000
+#   python benchmark.py startup --repeats 5
+#   python benchmark.py leaderboards --rows 100000 1000000 [--database-url postgresql+psycopg2://...]
+#   python benchmark.py staged --rows 10000 100000 --clean-workers 4
+#   python benchmark.py layout --rows 10000 100000
+#   python benchmark.py refresh --rows 2000 10000 --rounds 16 --budget 90
+# Every result is printed as one JSON line. --save-baseline writes the results to a file and
+# --baseline compares against one, exiting with status 1 when a timing regressed past --tolerance.
+
+WORDS = [
+    'data', 'learning', 'deep', 'neural', 'vision', 'language', 'model', 'pipeline', 'stream', 'graph',
+    'cloud', 'sql', 'query', 'engine', 'python', 'toolkit', 'dashboard', 'api', 'cluster', 'spark',
+    'tensor', 'vector', 'search', 'index', 'bench', 'parser', 'agent', 'robot', 'audio', 'image'
+]
+TOPICS = ['machine-learning', 'data-science', 'web', 'devops', 'database', 'security', 'cli', 'game']
+LANGUAGES = ['Python', 'JavaScript', 'TypeScript', 'Go', 'Rust', 'Java', 'C++', 'Jupyter Notebook', None]
+LICENSES = ['MIT License', 'Apache License 2.0', 'GNU General Public License v3.0', 'BSD 3-Clause "New" or "Revised" License', None]
+
+# Parsed and generated in chunks so 10M-row runs never hold every item dict at once
+CHUNK_ROWS = 100_000
+
+
+def synthetic_repositories(rows, seed=0):
+    rng = random.Random(seed)
+    names = ['-'.join(rng.sample(WORDS, 2)) + str(i) for i in range(rows)]
+    return pd.DataFrame({
+        'Repository_Name': names,
+        'Owner': [f'owner{rng.randrange(rows // 10 + 1)}' for _ in range(rows)],
+        'Description': [' '.join(rng.choices(WORDS, k=8)) for _ in range(rows)]
+    })
+
+
+# Search API items shaped like the ones fetch_repository_data consumes, with heavy-tailed star counts
+def synthetic_items(rows, seed=0, start=0):
+    rng = random.Random(seed * 1_000_003 + start)
+    for i in range(start, start + rows):
+        created = date(2008, 1, 1) + timedelta(days=rng.randrange(6000))
+        updated = created + timedelta(days=rng.randrange((date(2025, 1, 1) - created).days))
+        license_name = rng.choice(LICENSES)
+        yield {
+            'id': 10_000_000 + i,
+            'name': '-'.join(rng.sample(WORDS, 2)) + str(i),
+            'owner': {'login': f'Owner{rng.randrange(rows // 10 + 1)}'},
+            'description': ' '.join(rng.choices(WORDS, k=8)) if rng.random() > 0.1 else None,
+            'html_url': f'https://github.com/owner/repo{i}',
+            'language': rng.choice(LANGUAGES),
+            'created_at': f'{created.isoformat()}T12:00:00Z',
+            'updated_at': f'{updated.isoformat()}T08:30:00Z',
+            'stargazers_count': int(rng.paretovariate(1.2)) - 1,
+            'forks_count': int(rng.paretovariate(1.5)) - 1,
+            'open_issues_count': rng.randrange(200),
+            'license': {'name': license_name} if license_name else None
+        }
+
+
+# URL fields a real search item carries besides the ones the app reads; they make up most of its size
+ITEM_URL_FIELDS = [
+    'archive', 'assignees', 'blobs', 'branches', 'collaborators', 'comments', 'commits', 'compare', 'contents',
+    'contributors', 'deployments', 'downloads', 'events', 'forks', 'git_commits', 'git_refs', 'git_tags', 'hooks',
+    'issue_comment', 'issue_events', 'issues', 'keys', 'labels', 'languages', 'merges', 'milestones', 'notifications',
+    'pulls', 'releases', 'stargazers', 'statuses', 'subscribers', 'subscription', 'tags', 'teams', 'trees'
+]
+OWNER_URL_FIELDS = ['avatar', 'followers', 'following', 'gists', 'starred', 'subscriptions', 'organizations', 'repos', 'events']
+
+
+# Pad an item to the size of a full search API item (about 4 KB)
+def full_item(item):
+    repo = item['html_url'].replace('https://github.com/', 'https://api.github.com/repos/')
+    item.update({f'{name}_url': f'{repo}/{name}{{/sha}}' for name in ITEM_URL_FIELDS})
+    item['owner'].update({f'{name}_url': f"https://api.github.com/users/{item['owner']['login']}/{name}" for name in OWNER_URL_FIELDS})
+    item.update({'node_id': 'R_kgDO' + 'x' * 16, 'full_name': item['html_url'][19:], 'private': False, 'fork': False,
+                 'size': 1024, 'watchers_count': item['stargazers_count'], 'default_branch': 'main', 'score': 1.0,
+                 'topics': item['description'].split()[:5] if item['description'] else [], 'visibility': 'public'})
+    return item
+
+
+# Drop one character to simulate a typo
+def misspell(word, rng):
+    position = rng.randrange(len(word))
+    return word[:position] + word[position + 1:]
+
+
+def percentiles(latencies):
+    latencies = sorted(latencies)
+    return {
+        'p50_ms': statistics.median(latencies) * 1000,
+        'p99_ms': latencies[max(int(len(latencies) * 0.99) - 1, 0)] * 1000
+    }
+
+
+def bench_search(rows, queries=200, seed=0):
+    rng = random.Random(seed)
+    df = synthetic_repositories(rows, seed)
+
+    started = time.perf_counter()
+    index = SearchIndex(df)
+    build_seconds = time.perf_counter() - started
+
+    results = {'benchmark': 'search', 'rows': rows, 'build_seconds': build_seconds}
+    samples = {
+        'exact': [' '.join(rng.sample(WORDS, 2)) for _ in range(queries)],
+        'typo': [misspell(name, rng) for name in rng.sample(list(df['Repository_Name']), min(queries, rows))]
+    }
+    for kind, terms in samples.items():
+        latencies = []
+        for term in terms:
+            started = time.perf_counter()
+            index.search(term)
+            latencies.append(time.perf_counter() - started)
+        results.update({f'{kind}_{key}': value for key, value in percentiles(latencies).items()})
+
+    return results
+
+
+# Database search: `rows` repositories stored through the loader, which builds the full-text GIN and
+# pg_trgm name indexes, then queries.search_repositories timed for word, typo and topic-scoped queries.
+# The tsvector/pg_trgm query only exists on PostgreSQL; other databases report the stage as skipped.
+def bench_search_database(rows, queries=200, seed=0):
+    from sqlalchemy import text
+
+    from github_data_dive import clean, fetch, schema, store
+    from github_data_dive import queries as reads
+    from github_data_dive.database import get_engine
+
+    result = {'benchmark': 'search', 'stage': 'database', 'rows': rows}
+    if get_engine().dialect.name != 'postgresql':
+        return {**result, 'skipped': 'search_repositories needs PostgreSQL'}
+
+    rng = random.Random(seed)
+    names = []
+    started = time.perf_counter()
+    for start in range(0, rows, CHUNK_ROWS):
+        items = list(synthetic_items(min(CHUNK_ROWS, rows - start), seed, start))
+        names += [item['name'] for item in rng.sample(items, min(queries, len(items)))]
+        records = [fetch.repository_record(item, TOPICS[(start + i) % len(TOPICS)]) for i, item in enumerate(items)]
+        store.store_data(clean.clean_repository_data(pd.DataFrame(records, columns=fetch.REPOSITORY_COLUMNS)), finalize=False)
+    with get_engine().begin() as conn:
+        conn.execute(text(f'ANALYZE {schema.REPOS_TABLE if schema.NORMALIZED else schema.TABLE_NAME}'))
+    result.update(load_seconds=time.perf_counter() - started, trigram=reads.has_trigram())
+
+    samples = {
+        'exact': [(' '.join(rng.sample(WORDS, 2)), None) for _ in range(queries)],
+        'typo': [(misspell(name, rng), None) for name in rng.sample(names, min(queries, len(names)))],
+        'topic': [(' '.join(rng.sample(WORDS, 2)), rng.choice(TOPICS)) for _ in range(queries)]
+    }
+    for kind, terms in samples.items():
+        latencies, hits = [], 0
+        for term, topic in terms:
+            started = time.perf_counter()
+            hits += len(reads.search_repositories(term, topic))
+            latencies.append(time.perf_counter() - started)
+        result.update({f'{kind}_{key}': value for key, value in percentiles(latencies).items()})
+        result[f'{kind}_mean_hits'] = hits / len(terms)
+    return result
+
+
+# Minimal stand-in for the search endpoint: honours created:a..b, page and per_page, plus topic: and
+# pushed:>= for items that carry a 'topic' and 'pushed_at' (the refresh benchmark's items)
+class SearchHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        params = parse_qs(urlsplit(self.path).query)
+        query = params.get('q', [''])[0]
+        page, per_page = int(params.get('page', ['1'])[0]), int(params.get('per_page', ['30'])[0])
+
+        matches = self.server.items
+        topic = re.search(r'topic:(\S+)', query)
+        if topic:
+            matches = [item for item in matches if item.get('topic', topic.group(1)) == topic.group(1)]
+        pushed = re.search(r'pushed:>=(\S+)', query)
+        if pushed:
+            matches = [item for item in matches if item.get('pushed_at', item['updated_at'])[:10] >= pushed.group(1)]
+        created = re.search(r'created:(\S+)\.\.(\S+)', query)
+        if created:
+            low, high = created.groups()
+            matches = [item for item in matches if low <= item['created_at'][:10] <= high]
+
+        body = json.dumps({
+            'total_count': len(matches),
+            'incomplete_results': False,
+            'items': matches[(page - 1) * per_page:page * per_page]
+        }).encode()
+
+        # Like GitHub, every page carries an ETag and a matching If-None-Match gets an empty 304
+        etag = f'"{zlib.crc32(body):08x}"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_mock_api(items):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), SearchHandler)
+    server.items = sorted(items, key=lambda item: item['stargazers_count'], reverse=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_port}/search/repositories'
+
+
+# Serve full-size items from a separate process so its allocations and CPU stay out of the measurement.
+# With topics, the items are dealt round-robin across them.
+def serve_mock_api(rows, seed, ready, topics=()):
+    items = [full_item(item) for item in synthetic_items(rows, seed)]
+    for i, item in enumerate(items if topics else []):
+        item['topic'] = topics[i % len(topics)]
+    server, url = start_mock_api(items)
+    ready.put(url)
+    threading.Event().wait()
+
+
+def traced_peak_mb(func):
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1] / 1024 ** 2
+    finally:
+        tracemalloc.stop()
+
+
+# Peak Python memory of ingesting one topic of `rows` full-size items.
+# buffered: the whole topic is collected into one frame and cleaned, as fetch_repository_data does.
+# streaming: fixed-size batches are cleaned and dropped as they arrive, as the batch ingest does;
+# this peak should stay flat as rows grow, including the scheduler's ETag cache, which holds at most
+# ETAG_CACHE_PAGES decoded pages. One page is also parsed both ways: decoded in full
+# with response.json() into a list of dicts, and streamed into columns.
+def bench_memory(rows, batch_rows=1000, seed=0):
+    from github_data_dive import clean, fetch
+
+    ready = multiprocessing.Queue()
+    server = multiprocessing.Process(target=serve_mock_api, args=(rows, seed, ready), daemon=True)
+    server.start()
+    url = ready.get(timeout=300)
+
+    try:
+        def buffered():
+            pages = fetch.fetch_repository_pages('benchmark', fetch.RequestScheduler(tokens=[]), url=url)
+            clean.clean_repository_data(pd.concat(list(pages), ignore_index=True))
+
+        scheduler = fetch.RequestScheduler(tokens=[])
+
+        def streaming():
+            fetch.harvest_topics(['benchmark'], lambda topic, batch: clean.clean_repository_data(batch), max_workers=1,
+                                 scheduler=scheduler, url=url, batch_rows=batch_rows)
+
+        buffered_mb, streaming_mb = traced_peak_mb(buffered), traced_peak_mb(streaming)
+    finally:
+        server.terminate()
+
+    items = [full_item(item) for item in synthetic_items(fetch.PER_PAGE, seed)]
+    body = json.dumps({'total_count': fetch.PER_PAGE, 'incomplete_results': False, 'items': items}).encode()
+    del items
+
+    class Response:
+        def iter_content(self, chunk_size):
+            return (body[i:i + chunk_size] for i in range(0, len(body), chunk_size))
+
+    page_json_mb = traced_peak_mb(lambda: pd.DataFrame([fetch.repository_record(item, 'benchmark') for item in json.loads(body)['items']]))
+    page_stream_mb = traced_peak_mb(lambda: fetch.parse_search_page(Response()))
+
+    return {'benchmark': 'memory', 'rows': rows, 'batch_rows': batch_rows, 'buffered_peak_mb': buffered_mb,
+            'streaming_peak_mb': streaming_mb, 'etag_cached_pages': len(scheduler.etags), 'page_bytes': len(body), 'page_json_peak_mb': page_json_mb,
+            'page_stream_peak_mb': page_stream_mb}
+
+
+def frame_mb(df):
+    return df.memory_usage(deep=True).sum() / 1024 ** 2
+
+
+def max_rss_mb():
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return usage / 1024 ** 2 if sys.platform == 'darwin' else usage / 1024
+
+
+def stage_result(stage, rows, seconds, **extra):
+    return {'benchmark': 'pipeline', 'stage': stage, 'rows': rows, 'seconds': seconds,
+            'rows_per_sec': rows / seconds if seconds else None, **extra}
+
+
+# Time every pipeline stage on `rows` synthetic repositories spread over TOPICS.
+# The core modules are imported here, after DATABASE_URL and SNAPSHOT_DIR point at the benchmark's own
+# store. They are uncached, so every query below is timed as a cold, cache-missing render would run it.
+def bench_pipeline(rows, fetch_rows=5000, queries=50, seed=0):
+    from github_data_dive import clean, fetch, schema, store
+    from github_data_dive import queries as reads
+
+    results = []
+
+    # fetch: HTTP + JSON decode + record mapping through the real client against the mock API
+    server, url = start_mock_api(list(synthetic_items(min(fetch_rows, rows), seed)))
+    try:
+        started = time.perf_counter()
+        fetched = pd.concat(list(fetch.fetch_repository_pages('benchmark', fetch.RequestScheduler(tokens=[]), url=url)),
+                            ignore_index=True)
+        results.append(stage_result('fetch', len(fetched), time.perf_counter() - started))
+    finally:
+        server.shutdown()
+
+    # parse: search items to the raw repository frame, in chunks
+    parse_seconds, frames = 0.0, []
+    for start in range(0, rows, CHUNK_ROWS):
+        count = min(CHUNK_ROWS, rows - start)
+        items = list(synthetic_items(count, seed, start))
+        topic = TOPICS[(start // CHUNK_ROWS) % len(TOPICS)]
+        started = time.perf_counter()
+        frames.append(pd.DataFrame([fetch.repository_record(item, topic) for item in items], columns=fetch.REPOSITORY_COLUMNS))
+        parse_seconds += time.perf_counter() - started
+    raw = pd.concat(frames, ignore_index=True)
+    del frames, items
+    # Spread the rows over every topic regardless of chunking
+    raw['Topic'] = [TOPICS[i % len(TOPICS)] for i in range(len(raw))]
+    results.append(stage_result('parse', rows, parse_seconds, frame_mb=frame_mb(raw)))
+
+    # clean: the deferred 1M-row memory/throughput check lives here
+    started = time.perf_counter()
+    cleaned = clean.clean_repository_data(raw)
+    results.append(stage_result('clean', rows, time.perf_counter() - started,
+                                input_mb=frame_mb(raw), output_mb=frame_mb(cleaned), max_rss_mb=max_rss_mb()))
+    del raw
+
+    # store: staging load + merge + history + rollups + snapshot export
+    started = time.perf_counter()
+    counts = store.store_data(cleaned)
+    results.append(stage_result('store', rows, time.perf_counter() - started, **counts))
+
+    # Cold start: a fresh process reads everything, either from the database or from the snapshot
+    started = time.perf_counter()
+    loaded = reads.load_data()
+    results.append(stage_result('load_data', len(loaded), time.perf_counter() - started))
+
+    started = time.perf_counter()
+    snapshot = pd.read_parquet(schema.SNAPSHOT_DIR)
+    results.append(stage_result('snapshot_read', len(snapshot), time.perf_counter() - started))
+    del loaded, snapshot
+
+    # filters: the queries behind the sidebar for random selections, uncached, as latency percentiles
+    rng = random.Random(seed)
+    latencies, filtered_rows = [], 0
+    for _ in range(queries):
+        topic = rng.choice(TOPICS)
+        started = time.perf_counter()
+        options = reads.load_filter_options(topic)
+        selection = {
+            'topic': topic,
+            'language': rng.choice(['Default'] + options['languages']),
+            'creation_year': rng.choice(['Default'] + options['creation_years']),
+            'updated_year': 'Default'
+        }
+        reads.load_star_range(**selection)
+        filtered_data = reads.query_repositories(**selection)
+        latencies.append(time.perf_counter() - started)
+        filtered_rows += len(filtered_data)
+    results.append({'benchmark': 'pipeline', 'stage': 'filters', 'rows': rows, 'queries': queries,
+                    'mean_rows': filtered_rows / queries, **percentiles(latencies)})
+
+    # topic_page: the queries behind one Topic_Visuals render, whose bars come from ORDER BY/LIMIT
+    started = time.perf_counter()
+    topic_page = reads.load_topic_page(topic=TOPICS[0])
+    results.append(stage_result('topic_page', topic_page['count'], time.perf_counter() - started))
+
+    # aggregate: the per-topic counts and top-N bars Topic_Visuals builds, from the rollup and from rows
+    topic_data = reads.query_repositories(topic=TOPICS[0])
+    rollup = reads.load_rollup(topic=TOPICS[0])
+    started = time.perf_counter()
+    for by in ['Programming_Language', 'License_Type']:
+        reads.repository_counts(topic_data, rollup, by)
+        reads.repository_counts(topic_data, None, by)
+    for metric in clean.COUNT_COLUMNS:
+        reads.top_repositories(topic_page['top'][metric], metric, topic_page['count'], topic_page['totals'][metric])
+    results.append(stage_result('aggregate', len(topic_data), time.perf_counter() - started))
+
+    # verify: for random selections, every chart count served from the rollup equals the count over the selected rows
+    def counts(frame):
+        return {key if isinstance(key, str) else int(key): int(count) for key, count in zip(frame.iloc[:, 0], frame['Repository_Count'])}
+
+    mismatched, page_mismatched = [], []
+    for _ in range(queries):
+        topic = rng.choice(TOPICS)
+        options = reads.load_filter_options(topic)
+        selection = {'topic': topic, 'language': rng.choice(['Default'] + options['languages']),
+                     'creation_year': rng.choice(['Default'] + options['creation_years'])}
+        filtered_data = reads.query_repositories(**selection)
+        filtered_data['Creation_Year'] = filtered_data['Creation_Date'].dt.year
+        filtered_data['Creation_Month'] = filtered_data['Creation_Date'].dt.month
+        rollup = reads.load_rollup(**selection)
+        dimensions = ['Programming_Language', 'License_Type', 'Creation_Year']
+        if selection['creation_year'] != 'Default':
+            dimensions.append('Creation_Month')
+        for by in dimensions:
+            if rollup is None or counts(reads.repository_counts(filtered_data, rollup, by)) != counts(reads.repository_counts(filtered_data, None, by)):
+                mismatched.append({**selection, 'by': by})
+
+        # The topic page's count, totals and top-N bars equal those of the selected rows
+        topic_page = reads.load_topic_page(**selection)
+        if topic_page['count'] != len(filtered_data):
+            page_mismatched.append({**selection, 'by': 'count'})
+        for metric in clean.COUNT_COLUMNS:
+            expected = reads.top_repositories(filtered_data.nlargest(reads.MAX_CHART_ROWS, metric), metric,
+                                              len(filtered_data), int(filtered_data[metric].sum()))
+            bars = reads.top_repositories(topic_page['top'][metric], metric, topic_page['count'], topic_page['totals'][metric])
+            if bars[metric].tolist() != expected[metric].tolist():
+                page_mismatched.append({**selection, 'by': metric})
+    results.append({'benchmark': 'pipeline', 'stage': 'rollup_verify', 'rows': rows, 'selections': queries,
+                    'matches': not mismatched, 'mismatched': mismatched[:5]})
+    results.append({'benchmark': 'pipeline', 'stage': 'topic_page_verify', 'rows': rows, 'selections': queries,
+                    'matches': not page_mismatched, 'mismatched': page_mismatched[:5]})
+
+    # Stages like fetch and aggregate run on fewer rows than the scale, which keys the baseline
+    for result in results:
+        result['scale'] = rows
+    return results
+
+
+# Incremental leaderboards: ingest `rows` repositories in batches, then re-ingest a churned 10% sample
+# (new star counts, some languages changed, some repositories added under a second topic) and check the
+# incrementally maintained tables against a full recomputation. The leaderboard reads are then timed.
+def bench_leaderboards(rows, batch_rows=10_000, queries=50, seed=0):
+    from sqlalchemy import select
+
+    from github_data_dive import clean, fetch, leaderboards, schema, store
+    from github_data_dive import queries as reads
+    from github_data_dive.database import get_engine
+
+    rng = random.Random(seed)
+    results, samples = [], []
+    started = time.perf_counter()
+    for start in range(0, rows, batch_rows):
+        topic = TOPICS[(start // batch_rows) % len(TOPICS)]
+        items = synthetic_items(min(batch_rows, rows - start), seed, start)
+        batch = clean.clean_repository_data(pd.DataFrame([fetch.repository_record(item, topic) for item in items],
+                                                         columns=fetch.REPOSITORY_COLUMNS))
+        store.store_data(batch, finalize=False)
+        samples.append(batch.sample(frac=0.1, random_state=rng.randrange(2 ** 31)))
+    results.append(stage_result('ingest', rows, time.perf_counter() - started))
+
+    churn = pd.concat(samples, ignore_index=True).astype({'Topic': str, 'Programming_Language': str})
+    churn['Number_of_Stars'] = churn['Number_of_Stars'] + [rng.randrange(50) for _ in range(len(churn))]
+    moved = [rng.random() < 0.3 for _ in range(len(churn))]
+    churn.loc[moved, 'Programming_Language'] = 'rust'
+    second_topic = [rng.random() < 0.3 for _ in range(len(churn))]
+    churn.loc[second_topic, 'Topic'] = [rng.choice(TOPICS) for _ in range(sum(second_topic))]
+    started = time.perf_counter()
+    for start in range(0, len(churn), batch_rows):
+        store.store_data(churn.iloc[start:start + batch_rows], finalize=False)
+    results.append(stage_result('churn', len(churn), time.perf_counter() - started))
+
+    tables = [schema.owner_stats, schema.language_years, schema.license_mix]
+
+    def read_tables():
+        frames = [pd.read_sql(select(table), get_engine()) for table in tables]
+        return [df.sort_values(list(df.columns)).reset_index(drop=True).astype({name: 'int64' for name in df.columns[1:] if name != 'License_Type'})
+                for df in frames]
+
+    incremental = read_tables()
+    started = time.perf_counter()
+    with get_engine().begin() as conn:
+        leaderboards.rebuild_leaderboards(conn)
+    rebuild_seconds = time.perf_counter() - started
+    mismatched = [table.name for table, before, after in zip(tables, incremental, read_tables()) if not before.equals(after)]
+    results.append({'benchmark': 'leaderboards', 'stage': 'verify', 'rows': rows, 'matches': not mismatched,
+                    'mismatched': mismatched, 'rebuild_seconds': rebuild_seconds,
+                    'table_rows': {table.name: len(df) for table, df in zip(tables, incremental)}})
+
+    for name, load in [('owners', reads.load_owner_leaderboard), ('language_trend', reads.load_language_trend),
+                       ('license_mix', reads.load_license_mix)]:
+        latencies = []
+        for _ in range(queries):
+            started = time.perf_counter()
+            load()
+            latencies.append(time.perf_counter() - started)
+        results.append({'benchmark': 'leaderboards', 'stage': name, 'rows': rows, 'queries': queries, **percentiles(latencies)})
+
+    for result in results:
+        result.update(benchmark='leaderboards', scale=rows)
+    return results
+
+
+# Staged ingest against the serial path the fetch button used to run: every topic fetched in full,
+# cleaned and stored in turn. Both load `rows` repositories over TOPICS from a mock API in its own
+# process into an empty store, and the resulting tables must be identical.
+def bench_staged(rows, batch_rows=1000, fetch_workers=8, clean_workers=None, seed=0):
+    from sqlalchemy import MetaData, inspect, select
+
+    from github_data_dive import clean, fetch, pipeline, schema, store
+    from github_data_dive.database import get_engine
+
+    ready = multiprocessing.Queue()
+    server = multiprocessing.Process(target=serve_mock_api, args=(rows, seed, ready, TOPICS), daemon=True)
+    server.start()
+    url = ready.get(timeout=300)
+    tables = [schema.repositories, schema.rollups, schema.owner_stats, schema.language_years, schema.license_mix]
+
+    def read_tables():
+        frames = [pd.read_sql(select(table), get_engine()) for table in tables]
+        return [df.sort_values(list(df.columns)).reset_index(drop=True) for df in frames]
+
+    def reset_store():
+        with get_engine().begin() as conn:
+            for view in inspect(conn).get_view_names():
+                conn.exec_driver_sql(f'DROP VIEW {view}')
+        metadata = MetaData()
+        metadata.reflect(get_engine())
+        metadata.drop_all(get_engine())
+        store.prepared.clear()
+        shutil.rmtree(schema.SNAPSHOT_DIR, ignore_errors=True)
+
+    def serial():
+        scheduler = fetch.RequestScheduler(tokens=[])
+        for topic in TOPICS:
+            repo_df = pd.concat(list(fetch.fetch_repository_pages(topic, scheduler, url=url)), ignore_index=True)
+            store.store_data(clean.clean_repository_data(repo_df))
+
+    results = []
+    try:
+        started = time.perf_counter()
+        serial()
+        results.append(stage_result('serial', rows, time.perf_counter() - started))
+        expected = read_tables()
+        reset_store()
+
+        clean_workers = clean_workers or pipeline.CLEAN_WORKERS
+        with pipeline.clean_pool(clean_workers) as pool:
+            # Start the worker processes outside the timing, as the dashboard's cached pool would be
+            list(pool.map(abs, range(clean_workers)))
+            started = time.perf_counter()
+            stats = pipeline.run_pipeline(TOPICS, fetch_workers, clean_workers, scheduler=fetch.RequestScheduler(tokens=[]),
+                                          url=url, batch_rows=batch_rows, pool=pool)
+            results.append(stage_result('staged', rows, time.perf_counter() - started, clean_workers=clean_workers,
+                                        stages=stats['stages'], queues=stats['queues']))
+    finally:
+        server.terminate()
+
+    mismatched = [table.name for table, before, after in zip(tables, expected, read_tables()) if not before.equals(after)]
+    results.append({'benchmark': 'pipeline', 'stage': 'staged_verify', 'rows': rows, 'matches': not mismatched and not stats['errors'],
+                    'mismatched': mismatched, 'errors': stats['errors'], 'speedup': results[0]['seconds'] / results[1]['seconds']})
+    for result in results:
+        result.update(benchmark='staged', scale=rows)
+    return results
+
+
+# Bytes of the given tables and their indexes
+def relation_bytes(engine, names):
+    from sqlalchemy import bindparam, text
+
+    with engine.connect() as conn:
+        if conn.dialect.name == 'postgresql':
+            query = text('SELECT SUM(pg_total_relation_size(quote_ident(name))) FROM unnest(:names) AS name')
+            return int(conn.execute(query, {'names': names}).scalar())
+        query = text('SELECT SUM(d.pgsize) FROM dbstat d JOIN sqlite_master m ON m.name = d.name WHERE m.tbl_name IN :names')
+        return int(conn.execute(query.bindparams(bindparam('names', expanding=True)), {'names': names}).scalar())
+
+
+# Flat vs normalized storage of `rows` repositories, each fetched under one to three of TOPICS.
+# Both layouts ingest the same batches; the benchmark reports the bytes of each layout's tables and
+# indexes, the ingest and load_data times and the latency of a three-topic filter, and checks that
+# load_data returns the same rows through the normalized layout's compatibility view.
+def bench_layout(rows, queries=20, seed=0, database_url=None):
+    rng = random.Random(seed)
+    memberships = [rng.sample(TOPICS, rng.choice([1, 1, 2, 3])) for _ in range(rows)]
+    selected_topics = TOPICS[:3]
+
+    results, frames = [], {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for layout in ['flat', 'normalized']:
+            os.environ.update(STORAGE_LAYOUT=layout, TABLE_NAME=f'bench_{layout}', SNAPSHOT_DIR=os.path.join(workdir, layout),
+                              DATABASE_URL=database_url or f'sqlite:///{os.path.join(workdir, f"{layout}.db")}')
+            for module in [name for name in sys.modules if name.startswith('github_data_dive')]:
+                sys.modules.pop(module)
+            from github_data_dive import clean, fetch, schema, store
+            from github_data_dive import queries as reads
+            from github_data_dive.database import get_engine
+
+            started = time.perf_counter()
+            for start in range(0, rows, CHUNK_ROWS):
+                items = list(synthetic_items(min(CHUNK_ROWS, rows - start), seed, start))
+                for topic in TOPICS:
+                    records = [fetch.repository_record(item, topic) for item, topics in zip(items, memberships[start:])
+                               if topic in topics]
+                    store.store_data(clean.clean_repository_data(pd.DataFrame(records, columns=fetch.REPOSITORY_COLUMNS)),
+                                     finalize=False)
+            ingest_seconds = time.perf_counter() - started
+
+            tables = ([schema.REPOS_TABLE, schema.TOPICS_TABLE, schema.LANGUAGES_TABLE, schema.LICENSES_TABLE]
+                      if schema.NORMALIZED else [schema.TABLE_NAME])
+            stored_bytes = relation_bytes(get_engine(), tables)
+
+            started = time.perf_counter()
+            loaded = reads.load_data()
+            load_seconds = time.perf_counter() - started
+            frames[layout] = (loaded.astype({'Topic': str, 'Programming_Language': str, 'License_Type': str})
+                              .sort_values(store.KEY_COLUMNS).reset_index(drop=True))
+
+            latencies = []
+            for _ in range(queries):
+                started = time.perf_counter()
+                reads.query_repositories(['Repository_Name', 'Owner', 'Number_of_Stars'], topic=selected_topics,
+                                         language='python', limit=100)
+                latencies.append(time.perf_counter() - started)
+
+            results.append({'benchmark': 'layout', 'stage': layout, 'rows': rows, 'table_rows': len(loaded),
+                            'bytes': stored_bytes, 'ingest_seconds': ingest_seconds, 'load_seconds': load_seconds,
+                            **{f'multi_topic_{key}': value for key, value in percentiles(latencies).items()}})
+
+    flat, normalized = frames['flat'], frames['normalized']
+    results.append({'benchmark': 'layout', 'stage': 'verify', 'rows': rows,
+                    'matches': flat.equals(normalized[flat.columns]),
+                    'bytes_saved': 1 - results[1]['bytes'] / results[0]['bytes']})
+    for result in results:
+        result['scale'] = rows
+    return results
+
+
+# Topics of the refresh benchmark and the share of their repositories pushed between two rounds
+REFRESH_CHURN = {'hot': 0.02, 'warm': 0.0025, 'cold': 0.0001}
+
+
+# Incremental refresh against the mock API on a fake clock: `rows` repositories per topic, of which
+# a REFRESH_CHURN share is pushed (new stars, new updated/pushed date) before every round. Each round
+# reports the requests spent per topic next to the cost of refetching every topic in full, and the
+# changed rows a refreshed topic still has wrong in the database, which fail the run.
+def bench_refresh(rows, rounds=16, interval_hours=6, budget=90, seed=0):
+    from sqlalchemy import select
+
+    from github_data_dive import fetch, refresh, schema
+    from github_data_dive.database import get_engine
+
+    rng = random.Random(seed)
+    now = datetime(2025, 1, 1, tzinfo=timezone.utc).timestamp()
+    items = []
+    for offset, topic in enumerate(REFRESH_CHURN):
+        for item in synthetic_items(rows, seed, offset * rows):
+            items.append({**item, 'topic': topic, 'pushed_at': item['updated_at']})
+    server, url = start_mock_api(items)
+    full_requests = len(REFRESH_CHURN) * -(-rows // fetch.PER_PAGE)
+
+    results = []
+    try:
+        for round_number in range(rounds):
+            # Repositories pushed since the last round
+            today = datetime.fromtimestamp(now, timezone.utc).date().isoformat()
+            for topic, share in REFRESH_CHURN.items():
+                pushed = int(rows * share) + (rng.random() < rows * share % 1)
+                for item in rng.sample([item for item in items if item['topic'] == topic], pushed):
+                    item['stargazers_count'] += rng.randrange(1, 50)
+                    item['updated_at'] = item['pushed_at'] = f'{today}T09:00:00Z'
+            server.items = sorted(items, key=lambda item: item['stargazers_count'], reverse=True)
+
+            stats = refresh.run_refresh(list(REFRESH_CHURN), budget, clock=lambda: now, url=url,
+                                        scheduler=fetch.RequestScheduler(tokens=[]), batch_rows=fetch.PER_PAGE)
+
+            # Every changed repository of a topic refreshed to the end must now be up to date
+            missed = 0
+            complete = [entry['topic'] for entry in stats['plan'] if entry['complete']]
+            if complete:
+                r = schema.repositories.c
+                stored = pd.read_sql(select(r.Topic, r.Repository_Name, r.Number_of_Stars).where(r.Topic.in_(complete)), get_engine())
+                stars = dict(zip(zip(stored['Topic'], stored['Repository_Name']), stored['Number_of_Stars']))
+                missed = sum(1 for item in items if item['topic'] in complete
+                             and stars.get((item['topic'], item['name'])) != item['stargazers_count'])
+
+            results.append({'benchmark': 'refresh', 'stage': f'round{round_number}', 'rows': rows, 'hours': round_number * interval_hours,
+                            'requests': stats['requests'], 'full_requests': full_requests,
+                            'pages': {entry['topic']: entry['fetched_pages'] for entry in stats['plan']},
+                            'since': {entry['topic']: entry['since'].isoformat() if entry['since'] else 'full' for entry in stats['plan']},
+                            'changed': sum(entry['changed'] for entry in stats['plan']), 'missed': missed,
+                            'matches': missed == 0 and not stats['errors']})
+            now += interval_hours * 3600
+    finally:
+        server.shutdown()
+
+    spent = sum(result['requests'] for result in results)
+    results.append({'benchmark': 'refresh', 'stage': 'total', 'rows': rows, 'rounds': rounds, 'requests': spent,
+                    'full_requests': full_requests * rounds, 'saved': 1 - spent / (full_requests * rounds),
+                    'topic_refreshes': {topic: sum(topic in result['pages'] for result in results) for topic in REFRESH_CHURN}})
+    for result in results:
+        result['scale'] = rows
+    return results
+
+
+# Entry points timed by the startup benchmark: ingest is what a batch worker imports,
+# github_data_dive.ui what the dashboard imports before its first render
+STARTUP_MODULES = ['github_data_dive.fetch', 'github_data_dive.store', 'github_data_dive.queries', 'ingest', 'github_data_dive.ui']
+HEAVY_MODULES = ['streamlit', 'plotly', 'PIL', 'sqlalchemy']
+
+STARTUP_SCRIPT = '''
+import sys, time
+started = time.perf_counter()
+import {module}
+print(time.perf_counter() - started)
+print(",".join(name for name in {heavy!r} if name in sys.modules))
+'''
+
+
+# Import time of each entry point in a fresh interpreter, plus which heavy dependencies it pulled in
+def bench_startup(modules=STARTUP_MODULES, repeats=5):
+    results = []
+    for module in modules:
+        samples, loaded = [], ''
+        for _ in range(repeats):
+            process = subprocess.run([sys.executable, '-c', STARTUP_SCRIPT.format(module=module, heavy=HEAVY_MODULES)],
+                                     capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+            if process.returncode != 0:
+                results.append({'benchmark': 'startup', 'stage': module, 'error': process.stderr.strip().splitlines()[-1]})
+                break
+            seconds, loaded = process.stdout.splitlines()
+            samples.append(float(seconds))
+        else:
+            results.append({'benchmark': 'startup', 'stage': module, 'repeats': repeats, 'seconds': statistics.median(samples),
+                            'heavy_modules': loaded.split(',') if loaded else []})
+    return results
+
+
+# Timing fields compared against the baseline; every one of them is lower-is-better
+def timing_fields(result):
+    return [key for key in result if key == 'seconds' or key.endswith('_seconds') or key.endswith('_ms')]
+
+
+def result_key(result):
+    return f"{result['benchmark']}:{result.get('stage', '-')}:{result.get('scale', result.get('rows', '-'))}"
+
+
+# Slowdowns below this are timer noise on millisecond stages, whatever the ratio
+MIN_REGRESSION_SECONDS = 0.005
+
+
+# Timings slower than baseline * (1 + tolerance); results missing from the baseline are skipped
+def regressions(results, baseline, tolerance):
+    found = []
+    for result in results:
+        previous = baseline.get(result_key(result))
+        if previous is None:
+            continue
+        for field in timing_fields(result):
+            unit = 1000 if field.endswith('_ms') else 1
+            if not previous.get(field) or result[field] - previous[field] < MIN_REGRESSION_SECONDS * unit:
+                continue
+            if result[field] > previous[field] * (1 + tolerance):
+                found.append({'key': result_key(result), 'field': field, 'baseline': previous[field],
+                              'current': result[field], 'change': result[field] / previous[field] - 1})
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the explorer's data paths on synthetic data.")
+    parser.add_argument('--baseline', help="JSON baseline to compare against")
+    parser.add_argument('--save-baseline', help="write this run's results as a baseline")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="allowed slowdown before a timing counts as a regression")
+    subcommands = parser.add_subparsers(dest='benchmark', required=True)
+
+    search = subcommands.add_parser('search', help="in-process search index build time and query latency, plus the database search")
+    search.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000])
+    search.add_argument('--queries', type=int, default=200)
+    search.add_argument('--database-url', help="scratch PostgreSQL database for the tsvector/pg_trgm search (skipped without one)")
+
+    pipeline = subcommands.add_parser('pipeline', help="fetch, parse, clean, store, load, filter and aggregate timings")
+    pipeline.add_argument('--rows', type=int, nargs='+', default=[1_000, 100_000])
+    pipeline.add_argument('--fetch-rows', type=int, default=5_000, help="rows served through the mock HTTP API")
+    pipeline.add_argument('--queries', type=int, default=50, help="filter selections timed per scale")
+    pipeline.add_argument('--database-url', help="scratch database to benchmark, e.g. a local PostgreSQL (default: a temporary SQLite file)")
+
+    memory = subcommands.add_parser('memory', help="peak memory of buffered vs streaming ingest of one topic")
+    memory.add_argument('--rows', type=int, nargs='+', default=[1_000, 10_000, 50_000])
+    memory.add_argument('--batch-rows', type=int, default=1_000)
+
+    board = subcommands.add_parser('leaderboards', help="incremental leaderboard maintenance checked against a full rebuild")
+    board.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000])
+    board.add_argument('--batch-rows', type=int, default=10_000)
+    board.add_argument('--queries', type=int, default=50, help="reads timed per leaderboard")
+    board.add_argument('--database-url', help="scratch database to benchmark (default: a temporary SQLite file)")
+
+    staged = subcommands.add_parser('staged', help="staged fetch/clean/store pipeline against the serial path, checked for identical tables")
+    staged.add_argument('--rows', type=int, nargs='+', default=[10_000])
+    staged.add_argument('--batch-rows', type=int, default=1_000)
+    staged.add_argument('--fetch-workers', type=int, default=8)
+    staged.add_argument('--clean-workers', type=int, default=None, help="default: one per core")
+    staged.add_argument('--database-url', help="scratch database to benchmark (default: a temporary SQLite file)")
+
+    layout = subcommands.add_parser('layout', help="flat vs normalized storage: bytes, load time and multi-topic filter latency")
+    layout.add_argument('--rows', type=int, nargs='+', default=[10_000])
+    layout.add_argument('--queries', type=int, default=20, help="multi-topic filters timed per layout")
+    layout.add_argument('--database-url', help="scratch database to benchmark (default: temporary SQLite files)")
+
+    fresh = subcommands.add_parser('refresh', help="requests spent by incremental refresh rounds on a fake clock")
+    fresh.add_argument('--rows', type=int, nargs='+', default=[2_000], help="repositories per topic")
+    fresh.add_argument('--rounds', type=int, default=16)
+    fresh.add_argument('--interval-hours', type=float, default=6)
+    fresh.add_argument('--budget', type=int, default=90, help="result pages per round")
+    fresh.add_argument('--database-url', help="scratch database to benchmark (default: a temporary SQLite file)")
+
+    startup = subcommands.add_parser('startup', help="import time of the worker and dashboard entry points")
+    startup.add_argument('--repeats', type=int, default=5)
+
+    args = parser.parse_args()
+    results = []
+    if args.benchmark == 'search':
+        for rows in args.rows:
+            results.append(bench_search(rows, args.queries))
+            print(json.dumps(results[-1]))
+            if args.database_url:
+                with tempfile.TemporaryDirectory() as workdir:
+                    os.environ['DATABASE_URL'] = args.database_url
+                    os.environ['SNAPSHOT_DIR'] = os.path.join(workdir, 'snapshot')
+                    for module in [name for name in sys.modules if name.startswith('github_data_dive')]:
+                        sys.modules.pop(module)
+                    results.append(bench_search_database(rows, args.queries))
+                    print(json.dumps(results[-1]))
+    elif args.benchmark == 'memory':
+        for rows in args.rows:
+            results.append(bench_memory(rows, args.batch_rows))
+            print(json.dumps(results[-1]))
+    elif args.benchmark == 'layout':
+        for rows in args.rows:
+            for result in bench_layout(rows, args.queries, database_url=args.database_url):
+                results.append(result)
+                print(json.dumps(result))
+    elif args.benchmark == 'startup':
+        for result in bench_startup(repeats=args.repeats):
+            results.append(result)
+            print(json.dumps(result))
+    elif args.benchmark in ('pipeline', 'leaderboards', 'staged', 'refresh'):
+        for rows in args.rows:
+            # Every scale gets an empty store so the stages measure the same work each run
+            with tempfile.TemporaryDirectory() as workdir:
+                os.environ['DATABASE_URL'] = args.database_url or f'sqlite:///{os.path.join(workdir, "benchmark.db")}'
+                os.environ['SNAPSHOT_DIR'] = os.path.join(workdir, 'snapshot')
+                for module in [name for name in sys.modules if name.startswith('github_data_dive')]:
+                    sys.modules.pop(module)
+                if args.benchmark == 'pipeline':
+                    scale_results = bench_pipeline(rows, args.fetch_rows, args.queries)
+                elif args.benchmark == 'leaderboards':
+                    scale_results = bench_leaderboards(rows, args.batch_rows, args.queries)
+                elif args.benchmark == 'staged':
+                    scale_results = bench_staged(rows, args.batch_rows, args.fetch_workers, args.clean_workers)
+                else:
+                    scale_results = bench_refresh(rows, args.rounds, args.interval_hours, args.budget)
+                for result in scale_results:
+                    results.append(result)
+                    print(json.dumps(result))
+
+    # An incremental result that drifted from the full recomputation, or missed a change, fails the run
+    if any(result.get('matches') is False for result in results):
+        raise SystemExit(1)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump({result_key(result): result for result in results}, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            found = regressions(results, json.load(f), args.tolerance)
+        for regression in found:
+            print(json.dumps({'regression': regression}))
+        if found:
+            raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
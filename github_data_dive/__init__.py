@@ -0,0 +1,4 @@
+# GitHub Data Dive: fetch, clean, store and query GitHub repositories.
+# The core modules (fetch, clean, schema, store, queries, database) never import Streamlit or plotly,
+# and nothing connects to a database until a query runs; ui is the Streamlit shell over them.
+# Submodules are imported on demand, so importing the package itself is free.
@@ -0,0 +1,56 @@
+import pandas as pd
+
+from github_data_dive.instrumentation import span
+
+
+# Cleaning and dtype compaction of fetched repository frames; pandas only
+
+DATE_COLUMNS = ['Creation_Date', 'Last_Updated_Date']
+
+# Low-cardinality text columns stored as categories, and count columns downcast to the narrowest int
+CATEGORY_COLUMNS = ['Topic', 'Programming_Language', 'License_Type']
+COUNT_COLUMNS = ['Number_of_Stars', 'Number_of_Forks', 'Number_of_Open_Issues']
+
+
+# Categories and narrow ints cut the memory of a repository frame to a fraction of object/int64
+def compact_dtypes(df):
+    for column in CATEGORY_COLUMNS:
+        if column in df.columns:
+            df[column] = df[column].astype('category')
+    for column in COUNT_COLUMNS:
+        if column in df.columns:
+            df[column] = pd.to_numeric(df[column], downcast='integer')
+    return df
+
+
+def clean_repository_data(repo_df):
+    with span('clean', rows=len(repo_df)):
+        return clean_frame(repo_df)
+
+
+def clean_frame(repo_df):
+    # 1. Fill Missing Values
+    # Missing languages become 'Unknown', missing licenses and descriptions 'None'
+    repo_df = repo_df.fillna({'Programming_Language': 'Unknown', 'License_Type': 'None', 'Description': 'None'})
+
+    # 2. Convert Dates to datetime64 at day precision, so consumers never re-parse them
+    for column in DATE_COLUMNS:
+        repo_df[column] = pd.to_datetime(repo_df[column], utc=True).dt.tz_localize(None).dt.normalize()
+
+    # 3. Handle Duplicates (if any)
+    # Ensure that repositories are unique based on the repository name and owner
+    repo_df = repo_df.drop_duplicates(subset=['Repository_Name', 'Owner'])
+
+    # 4. Ensure Data Consistency (Standardizing formats)
+    # Convert all text fields to lowercase; category columns are lowered once per distinct value
+    repo_df = compact_dtypes(repo_df)
+    for column in ['Repository_Name', 'Owner']:
+        repo_df[column] = repo_df[column].str.lower()
+    for column in ['Programming_Language', 'License_Type']:
+        repo_df[column] = repo_df[column].str.lower().astype('category')
+
+    # 5. Change index name to 'ID' and start from 1
+    repo_df.index = repo_df.index + 1
+    repo_df.index.name = 'ID'
+
+    return repo_df
@@ -0,0 +1,128 @@
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+
+
+# One engine factory for the ingest app, the explorer and the load test.
+# Every setting comes from the environment so deployments can size the pool to the server:
+#   DATABASE_URL           primary database, used for writes (required: credentials stay out of the source)
+#   READ_DATABASE_URL      optional read-only replica for the explorer (defaults to DATABASE_URL)
+#   DB_POOL_SIZE           connections kept open per server process
+#   DB_MAX_OVERFLOW        extra connections opened under burst load, closed when returned
+#   DB_POOL_TIMEOUT        seconds a session waits for a free connection before failing
+#   DB_POOL_RECYCLE        seconds after which a pooled connection is replaced
+#   DB_STATEMENT_TIMEOUT   milliseconds before PostgreSQL cancels an explorer query (0 disables); writes,
+#                          merges and index builds run on engines without a timeout
+#   DB_ASYNC               set to 1 to run a page's independent queries through asyncpg
+DATABASE_URL = os.getenv('DATABASE_URL')
+READ_DATABASE_URL = os.getenv('READ_DATABASE_URL') or DATABASE_URL
+
+POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '10'))
+MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '20'))
+POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '10'))
+POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))
+STATEMENT_TIMEOUT = int(os.getenv('DB_STATEMENT_TIMEOUT', '15000'))
+ASYNC_QUERIES = os.getenv('DB_ASYNC', '0') == '1'
+
+
+# Checked when the first engine is made, so importing the package works without a database
+def require_url(url):
+    if not url:
+        raise RuntimeError("DATABASE_URL is not set; export it as postgresql+psycopg2://<username>:<password>@<host>:5432/<database>")
+    return url
+
+
+def is_postgres(url):
+    return make_url(url).get_backend_name() == 'postgresql'
+
+
+# Pre-ping drops connections the server closed while idle instead of failing the next render.
+# statement_timeout (milliseconds, 0 for none) is set on every connection of a PostgreSQL engine.
+def make_engine(url=DATABASE_URL, statement_timeout=0):
+    require_url(url)
+    options = {'pool_pre_ping': True}
+    if is_postgres(url):
+        options.update(pool_size=POOL_SIZE, max_overflow=MAX_OVERFLOW,
+                       pool_timeout=POOL_TIMEOUT, pool_recycle=POOL_RECYCLE)
+        if statement_timeout:
+            options['connect_args'] = {'options': f'-c statement_timeout={statement_timeout}'}
+    return create_engine(url, **options)
+
+
+# One engine per URL and timeout per process, created on first use so importing the package never
+# connects. Writers use the default, untimed engine; the explorer reads through get_read_engine.
+@functools.lru_cache(maxsize=None)
+def get_engine(url=DATABASE_URL, statement_timeout=0):
+    return make_engine(url, statement_timeout)
+
+
+# The explorer's engine: the replica when one is configured, with DB_STATEMENT_TIMEOUT on every query
+def get_read_engine():
+    return get_engine(READ_DATABASE_URL, STATEMENT_TIMEOUT)
+
+
+# Async engines and their pools belong to one event loop, so the loop runs for the life
+# of the process in a background thread and Streamlit's script threads submit to it
+class AsyncReader:
+    def __init__(self, url=READ_DATABASE_URL):
+        from sqlalchemy.ext.asyncio import create_async_engine
+
+        options = {'pool_pre_ping': True, 'pool_size': POOL_SIZE, 'max_overflow': MAX_OVERFLOW,
+                   'pool_timeout': POOL_TIMEOUT, 'pool_recycle': POOL_RECYCLE}
+        if STATEMENT_TIMEOUT:
+            options['connect_args'] = {'server_settings': {'statement_timeout': str(STATEMENT_TIMEOUT)}}
+        self.engine = create_async_engine(make_url(url).set(drivername='postgresql+asyncpg'), **options)
+
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self.loop.run_forever, name='async-reader', daemon=True).start()
+
+    async def read(self, statement):
+        async with self.engine.connect() as conn:
+            result = await conn.execute(statement)
+            return pd.DataFrame(result.fetchall(), columns=list(result.keys()))
+
+    def read_all(self, statements):
+        async def gather():
+            return await asyncio.gather(*(self.read(statement) for statement in statements), return_exceptions=True)
+        return asyncio.run_coroutine_threadsafe(gather(), self.loop).result()
+
+
+# The async path needs asyncpg and a PostgreSQL URL; anything else reads through the sync pool
+def make_async_reader(url=READ_DATABASE_URL):
+    if not ASYNC_QUERIES or not is_postgres(require_url(url)):
+        return None
+    try:
+        import asyncpg  # noqa: F401
+    except ImportError:
+        return None
+    return AsyncReader(url)
+
+
+@functools.lru_cache(maxsize=None)
+def get_async_reader(url=READ_DATABASE_URL):
+    return make_async_reader(url)
+
+
+def read_frame(engine, statement):
+    try:
+        return pd.read_sql(statement, engine)
+    except Exception as error:
+        return error
+
+
+# Run independent SELECTs concurrently and return their frames in order.
+# A failed query yields its exception in place of a frame so callers can fall back per query.
+def read_frames(engine, statements, async_reader=None):
+    if async_reader is not None:
+        return async_reader.read_all(statements)
+    if len(statements) == 1:
+        return [read_frame(engine, statements[0])]
+
+    with ThreadPoolExecutor(max_workers=len(statements)) as executor:
+        return list(executor.map(lambda statement: read_frame(engine, statement), statements))
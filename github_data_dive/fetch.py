@@ -0,0 +1,495 @@
+import codecs
+import copy
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, timedelta
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+
+from github_data_dive.instrumentation import span
+
+
+# Fetching from the GitHub search API: request scheduling, streaming decode and topic harvesting.
+# Imports neither Streamlit nor SQLAlchemy, so batch workers start quickly.
+
+# GitHub API endpoint
+api_url = "https://api.github.com/search/repositories"
+
+# The search API never returns more than 1000 results for a single query
+SEARCH_RESULT_CAP = 1000
+PER_PAGE = 100
+
+# Decoded pages kept for ETag replays, least recently used evicted first. Each holds up to
+# PER_PAGE repositories, so this bounds the cache of a long-lived scheduler.
+ETAG_CACHE_PAGES = int(os.getenv("ETAG_CACHE_PAGES", "64"))
+
+# Oldest creation date used when splitting a topic into created: ranges
+GITHUB_EPOCH = date(2007, 10, 1)
+
+# Columns produced for every fetched repository
+REPOSITORY_COLUMNS = [
+    "Topic", "Repository_Name", "Owner", "Description", "URL", "Programming_Language",
+    "Creation_Date", "Last_Updated_Date", "Number_of_Stars", "Number_of_Forks",
+    "Number_of_Open_Issues", "License_Type", "Repository_Id"
+]
+
+
+# Raised from a request or rate-limit wait once the scheduler's stop event is set
+class FetchStopped(Exception):
+    def __init__(self):
+        super().__init__("Fetch stopped before the topic finished")
+
+
+# Shared keep-alive session, with a connection pool sized for the harvester workers
+def create_session(pool_size=16):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"Accept": "application/vnd.github+json"})
+    return session
+
+
+# Paces search requests across one or more tokens, retries throttled calls with
+# backoff and sends If-None-Match so unchanged pages come back as free 304s
+class RequestScheduler:
+    def __init__(self, session=None, tokens=None, max_retries=5, backoff=2.0, max_concurrency=8,
+                 etag_cache_pages=ETAG_CACHE_PAGES):
+        if tokens is None:
+            tokens = [t.strip() for t in os.getenv("GITHUB_TOKENS", os.getenv("GITHUB_TOKEN", "")).split(",") if t.strip()]
+
+        self.session = session or create_session(max_concurrency)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.quota = {token: {"remaining": None, "reset": 0.0} for token in (tokens or [None])}
+        self.etags = OrderedDict()
+        self.etag_cache_pages = etag_cache_pages
+        self.lock = threading.Lock()
+        self.slots = threading.BoundedSemaphore(max_concurrency)
+        self.stats = {"requests": 0, "not_modified": 0, "retries": 0, "throttled_seconds": 0.0}
+        self.stop = threading.Event()
+
+    # A view sharing this scheduler's session, quota, ETags, slots and counters whose requests and
+    # rate-limit waits end with FetchStopped as soon as stop is set, so one run can be interrupted on its own
+    def with_stop(self, stop):
+        view = copy.copy(self)
+        view.stop = stop
+        return view
+
+    # Sleep on behalf of the rate limiter and account for the time spent
+    def _throttle(self, seconds):
+        started = time.perf_counter()
+        stopped = self.stop.wait(max(seconds, 0.0))
+        with self.lock:
+            self.stats["throttled_seconds"] += time.perf_counter() - started
+        if stopped:
+            raise FetchStopped()
+
+    # Pick the token with the most remaining quota, waiting for a reset if all are spent
+    def _acquire_token(self):
+        while True:
+            with self.lock:
+                now = time.time()
+                for state in self.quota.values():
+                    if state["remaining"] is not None and state["remaining"] <= 0 and now >= state["reset"]:
+                        state["remaining"] = None
+
+                available = [(token, state) for token, state in self.quota.items()
+                             if state["remaining"] is None or state["remaining"] > 0]
+                if available:
+                    token, state = max(available, key=lambda ts: float("inf") if ts[1]["remaining"] is None else ts[1]["remaining"])
+                    if state["remaining"] is not None:
+                        state["remaining"] -= 1
+                    return token
+
+                wait = min(state["reset"] for state in self.quota.values()) - now
+            self._throttle(max(wait, 1.0))
+
+    def _update_quota(self, token, response):
+        remaining = response.headers.get("X-RateLimit-Remaining")
+        reset = response.headers.get("X-RateLimit-Reset")
+        if remaining is None:
+            return
+        with self.lock:
+            self.quota[token]["remaining"] = int(remaining)
+            if reset is not None:
+                self.quota[token]["reset"] = float(reset)
+
+    # Primary (quota exhausted) and secondary (abuse detection) limits both surface as 403/429
+    def _is_throttled(self, response):
+        if response.status_code == 429:
+            return True
+        if response.status_code != 403:
+            return False
+        return (response.headers.get("X-RateLimit-Remaining") == "0"
+                or "Retry-After" in response.headers
+                or "rate limit" in response.text.lower())
+
+    def _retry_delay(self, response, attempt):
+        if "Retry-After" in response.headers:
+            return float(response.headers["Retry-After"])
+        if response.headers.get("X-RateLimit-Remaining") == "0" and "X-RateLimit-Reset" in response.headers:
+            return float(response.headers["X-RateLimit-Reset"]) - time.time() + 1
+        return self.backoff * 2 ** attempt
+
+    # parse(response) replaces response.json() for callers that stream the body;
+    # whatever it returns is what gets cached for ETag replays
+    def get(self, url, params, parse=None):
+        key = (url, tuple(sorted(params.items())))
+
+        for attempt in range(self.max_retries + 1):
+            if self.stop.is_set():
+                raise FetchStopped()
+            token = self._acquire_token()
+            headers = {}
+            if token:
+                headers["Authorization"] = f"Bearer {token}"
+            with self.lock:
+                cached = self.etags.get(key)
+                if cached:
+                    self.etags.move_to_end(key)
+            if cached:
+                headers["If-None-Match"] = cached[0]
+
+            with self.slots, span('http_fetch'):
+                response = self.session.get(url, params=params, headers=headers, timeout=30, stream=parse is not None)
+            self._update_quota(token, response)
+            with self.lock:
+                self.stats["requests"] += 1
+
+            if response.status_code == 304 and cached:
+                response.close()
+                with self.lock:
+                    self.stats["not_modified"] += 1
+                return cached[1]
+
+            if self._is_throttled(response) or response.status_code >= 500:
+                response.close()
+                with self.lock:
+                    self.stats["retries"] += 1
+                self._throttle(self._retry_delay(response, attempt))
+                continue
+
+            response.raise_for_status()
+            with span('json_decode'):
+                payload = parse(response) if parse else response.json()
+            if "ETag" in response.headers and self.etag_cache_pages > 0:
+                with self.lock:
+                    self.etags[key] = (response.headers["ETag"], payload)
+                    self.etags.move_to_end(key)
+                    while len(self.etags) > self.etag_cache_pages:
+                        self.etags.popitem(last=False)
+            return payload
+
+        raise RuntimeError(f"GitHub request still throttled after {self.max_retries} retries: {params.get('q')}")
+
+    # Counters for the fetch summary: 304s are requests saved from the hourly quota
+    def counters(self):
+        with self.lock:
+            stats = dict(self.stats)
+        stats["requests_saved"] = stats["not_modified"]
+        stats["not_modified_rate"] = stats["not_modified"] / stats["requests"] if stats["requests"] else 0.0
+        return stats
+
+
+# Columns taken from each search API item; Topic is added per batch
+ITEM_COLUMNS = REPOSITORY_COLUMNS[1:]
+
+
+# Project one search API item onto ITEM_COLUMNS
+def project_item(item):
+    return (
+        item["name"],
+        item["owner"]["login"],
+        item["description"],
+        item["html_url"],
+        item["language"],
+        item["created_at"],
+        item["updated_at"],
+        item["stargazers_count"],
+        item["forks_count"],
+        item["open_issues_count"],
+        item["license"]["name"] if item["license"] else "Unknown",
+        item["id"]
+    )
+
+
+# Map one search API item to a repository row
+def repository_record(item, topic):
+    return dict(zip(REPOSITORY_COLUMNS, (topic, *project_item(item))))
+
+
+# Bytes read from the response per step of the streaming decoder
+STREAM_CHUNK_BYTES = 64 * 1024
+
+
+# Incremental decoder for a search response body. Top-level fields are returned as a dict,
+# while each element of "items" is decoded, handed to on_item and dropped, so at most one
+# raw item and one chunk of text are held at a time instead of the whole decoded payload.
+class SearchResponseParser:
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.text = codecs.getincrementaldecoder("utf-8")()
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.position = 0
+
+    def _fill(self):
+        chunk = next(self.chunks, None)
+        if chunk is None:
+            raise ValueError("Search response ended before the JSON document was complete")
+        self.buffer = self.buffer[self.position:] + self.text.decode(chunk)
+        self.position = 0
+
+    def _peek(self):
+        while True:
+            while self.position < len(self.buffer) and self.buffer[self.position].isspace():
+                self.position += 1
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            self._fill()
+
+    def _expect(self, allowed):
+        char = self._peek()
+        if char not in allowed:
+            raise ValueError(f"Unexpected {char!r} in search response, expected one of {allowed!r}")
+        self.position += 1
+        return char
+
+    # A value is only accepted when text follows it, so a number split across chunks is never cut short
+    def _value(self):
+        self._peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.position)
+                if end < len(self.buffer):
+                    self.position = end
+                    return value
+            except json.JSONDecodeError:
+                pass
+            self._fill()
+
+    def parse(self, on_item):
+        fields = {}
+        self._expect("{")
+        if self._peek() == "}":
+            return fields
+
+        while True:
+            key = self._value()
+            self._expect(":")
+            if key == "items":
+                self._expect("[")
+                if self._peek() == "]":
+                    self.position += 1
+                else:
+                    while True:
+                        on_item(self._value())
+                        if self._expect(",]") == "]":
+                            break
+            else:
+                fields[key] = self._value()
+            if self._expect(",}") == "}":
+                return fields
+
+
+# Stream a search response into columnar lists: {"total_count": ..., "columns": {column: [...]}}
+def parse_search_page(response):
+    columns = [[] for _ in ITEM_COLUMNS]
+
+    def on_item(item):
+        for values, value in zip(columns, project_item(item)):
+            values.append(value)
+
+    page = SearchResponseParser(response.iter_content(STREAM_CHUNK_BYTES)).parse(on_item)
+    page["columns"] = dict(zip(ITEM_COLUMNS, columns))
+    return page
+
+
+# Accumulates projected pages and hands them out as fixed-size DataFrame batches
+class ColumnBuffer:
+    def __init__(self, topic):
+        self.topic = topic
+        self.columns = {name: [] for name in ITEM_COLUMNS}
+        self.rows = 0
+        self.pages = 0
+
+    def extend(self, columns):
+        for name, values in columns.items():
+            self.columns[name].extend(values)
+        self.rows += len(columns["Repository_Name"])
+        self.pages += 1
+
+    def flush(self):
+        batch = pd.DataFrame(self.columns, columns=ITEM_COLUMNS)
+        batch.insert(0, "Topic", self.topic)
+        batch.attrs["pages"] = self.pages
+        self.columns = {name: [] for name in ITEM_COLUMNS}
+        self.rows = 0
+        self.pages = 0
+        return batch
+
+
+# Fetch a single page of search results
+def search_page(scheduler, query, page, url=api_url):
+    params = {
+        "q": query,
+        "sort": "stars",
+        "per_page": PER_PAGE,
+        "page": page
+    }
+
+    return scheduler.get(url, params, parse=parse_search_page)
+
+
+# Split a topic into created: date ranges that each stay under the search result cap, oldest first.
+# Yields (query, first_page, end) triples so the probe request is reused as page 1 and the caller
+# knows the last creation date the query covers; ranges are planned lazily, so only the first pages
+# along the current split path are held in memory.
+# With since, only repositories pushed on or after that date are requested.
+def plan_queries(scheduler, topic, start=None, end=None, url=api_url, since=None):
+    qualifiers = f" pushed:>={since.isoformat()}" if since else ""
+    if start is None and end is None:
+        query = f"topic:{topic}{qualifiers}"
+        start, end = GITHUB_EPOCH, date.today()
+    else:
+        query = f"topic:{topic}{qualifiers} created:{start.isoformat()}..{end.isoformat()}"
+
+    first_page = search_page(scheduler, query, 1, url)
+    total = first_page.get("total_count", 0)
+
+    if total <= SEARCH_RESULT_CAP or start >= end:
+        if total:
+            yield query, first_page, end
+        return
+
+    del first_page
+    middle = start + (end - start) // 2
+    yield from plan_queries(scheduler, topic, start, middle, url, since)
+    yield from plan_queries(scheduler, topic, middle + timedelta(days=1), end, url, since)
+
+
+# Walk every result page for a topic, yielding DataFrames of batch_rows rows as the pages arrive
+# (one page per DataFrame by default); df.attrs["pages"] is the number of pages in each.
+# since limits the walk to repositories pushed on or after that date, and created_after resumes an
+# earlier walk with the repositories created after that date. The generator returns (complete,
+# created_through): whether it reached the last result page, i.e. max_pages did not cut the walk
+# short, and the last creation date whose repositories were all walked (None when none were), which
+# a later call passes back as created_after to continue where this one stopped.
+def fetch_repository_pages(topic, scheduler=None, max_pages=None, url=api_url, batch_rows=PER_PAGE, since=None,
+                           created_after=None):
+    scheduler = scheduler or RequestScheduler()
+    buffer = ColumnBuffer(topic)
+    pages_fetched = 0
+    complete = True
+    created_through = created_after
+    today = date.today()
+    if created_after is not None and created_after >= today:
+        return complete, created_through
+    start, end = (created_after + timedelta(days=1), today) if created_after is not None else (None, None)
+
+    for query, first_page, query_end in plan_queries(scheduler, topic, start, end, url, since):
+        total = min(first_page["total_count"], SEARCH_RESULT_CAP)
+        last_page = -(-total // PER_PAGE)
+
+        payload = first_page
+        for page in range(1, last_page + 1):
+            if max_pages is not None and pages_fetched >= max_pages:
+                complete = False
+                break
+            if page > 1:
+                payload = search_page(scheduler, query, page, url)
+            if not payload["columns"]["Repository_Name"]:
+                break
+
+            pages_fetched += 1
+            buffer.extend(payload["columns"])
+            if buffer.rows >= batch_rows:
+                yield buffer.flush()
+
+        if not complete:
+            break
+        created_through = query_end
+
+        # Stop before probing the next created: range once the page limit is spent; the walk is
+        # only finished when this query reached the newest creation date
+        if max_pages is not None and pages_fetched >= max_pages:
+            complete = query_end >= today
+            break
+
+    if buffer.rows:
+        yield buffer.flush()
+    return complete, created_through
+
+
+# Function to fetch repository data
+def fetch_repository_data(topic, max_pages=None, scheduler=None):
+    pages = list(fetch_repository_pages(topic, scheduler, max_pages))
+    if not pages:
+        return pd.DataFrame(columns=REPOSITORY_COLUMNS)
+
+    return pd.concat(pages, ignore_index=True)
+
+
+# harvest_topics options are given either once for every topic or as a {topic: value} dict
+def per_topic(option, topic):
+    return option.get(topic) if isinstance(option, dict) else option
+
+
+# Harvest many topics concurrently over a bounded worker pool sharing one scheduler.
+# Each batch of batch_rows rows (one page by default) is handed to on_page(topic, page_df)
+# as soon as it fills, and on_done(topic) is called once every page of a topic has been handled.
+# stats["complete"] maps each harvested topic to whether its walk reached the last result page, and
+# stats["created_through"] to the last creation date it walked in full (see fetch_repository_pages).
+def harvest_topics(topics, on_page, max_workers=8, max_pages=None, scheduler=None, url=api_url, on_done=None,
+                   batch_rows=PER_PAGE, since=None, created_after=None):
+    scheduler = scheduler or RequestScheduler(max_concurrency=max_workers)
+    stats = {"pages": 0, "repositories": 0, "fetch_seconds": 0.0, "errors": {}, "complete": {}, "created_through": {}}
+    lock = threading.Lock()
+
+    # Topics still queued when the scheduler is stopped end before their first request
+    def harvest(topic):
+        if scheduler.stop.is_set():
+            raise FetchStopped()
+        pages = fetch_repository_pages(topic, scheduler, per_topic(max_pages, topic), url, batch_rows, per_topic(since, topic),
+                                       per_topic(created_after, topic))
+        while True:
+            started = time.perf_counter()
+            try:
+                page_df = next(pages)
+            except StopIteration as done:
+                with lock:
+                    stats["complete"][topic], stats["created_through"][topic] = done.value
+                break
+            fetched = time.perf_counter() - started
+
+            on_page(topic, page_df)
+            with lock:
+                stats["pages"] += page_df.attrs.get("pages", 1)
+                stats["repositories"] += len(page_df)
+                stats["fetch_seconds"] += fetched
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(harvest, topic): topic for topic in topics}
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception as exc:
+                stats["errors"][futures[future]] = str(exc)
+            else:
+                if on_done:
+                    on_done(futures[future])
+
+    elapsed = time.perf_counter() - started
+    stats["seconds"] = elapsed
+    stats["pages_per_sec"] = stats["pages"] / elapsed if elapsed else 0.0
+    stats["repos_per_sec"] = stats["repositories"] / elapsed if elapsed else 0.0
+    stats.update(scheduler.counters())
+    return stats
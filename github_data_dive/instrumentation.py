@@ -0,0 +1,135 @@
+import cProfile
+import contextlib
+import json
+import logging
+import os
+import threading
+import time
+
+
+# Lightweight timing spans for the fetch, clean, store, query and chart stages.
+# A span is recorded when at least one consumer is on:
+#   - the sidebar performance panel, for the current rerun of the current session
+#   - PERF_LOG=1, one JSON log line per span on the "github_data_dive.timing" logger
+#   - PERF_METRICS_FILE, Prometheus text-format totals rewritten after every rerun
+# With all three off, span() hands back a no-op context manager whose fields go nowhere.
+
+logger = logging.getLogger('github_data_dive.timing')
+LOG_SPANS = os.getenv('PERF_LOG', '0') == '1'
+METRICS_FILE = os.getenv('PERF_METRICS_FILE')
+PROFILE_DIR = os.getenv('PERF_PROFILE_DIR', 'profiles')
+
+if LOG_SPANS and not logger.handlers:
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+# Streamlit runs each session's script in its own thread, so a rerun's spans are per thread
+_local = threading.local()
+_metrics = {}
+_metrics_lock = threading.Lock()
+
+
+class Span:
+    def __init__(self, name, rows=None):
+        self.name = name
+        self.fields = {'rows': rows} if rows is not None else {}
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self.fields
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self.started
+        record = {'span': self.name, 'seconds': round(seconds, 6), **self.fields}
+        if exc_type is not None:
+            record['error'] = exc_type.__name__
+
+        recorder = getattr(_local, 'recorder', None)
+        if recorder is not None:
+            recorder.append(record)
+        if LOG_SPANS:
+            logger.info(json.dumps(record, default=str))
+        if METRICS_FILE:
+            with _metrics_lock:
+                totals = _metrics.setdefault(self.name, [0, 0.0, 0])
+                totals[0] += 1
+                totals[1] += seconds
+                totals[2] += self.fields.get('rows') or 0
+        return False
+
+
+# Time a block: `with span('clean', rows=len(df)) as fields: ...`; extra fields can be set inside.
+# Spans nest and run on many threads at once, so even a disabled span gets a fields dict of its own.
+def span(name, rows=None):
+    if getattr(_local, 'recorder', None) is None and not LOG_SPANS and not METRICS_FILE:
+        return contextlib.nullcontext({})
+    return Span(name, rows)
+
+
+# Begin collecting this thread's spans for the panel; profile=True also runs cProfile
+def start_rerun(profile=False):
+    _local.recorder = []
+    _local.profiler = cProfile.Profile() if profile else None
+    _local.started = time.perf_counter()
+    if _local.profiler:
+        _local.profiler.enable()
+
+
+# True while this thread's rerun is collected for the panel; gates measurements only the panel shows
+def recording():
+    return getattr(_local, 'recorder', None) is not None
+
+
+# Stop collecting and return the spans, the rerun's wall time and the profile path if one was written.
+# The .prof file opens in snakeviz, or converts to a flame graph with flameprof.
+def finish_rerun():
+    spans, profiler = getattr(_local, 'recorder', None) or [], getattr(_local, 'profiler', None)
+    seconds = time.perf_counter() - getattr(_local, 'started', time.perf_counter())
+    _local.recorder = _local.profiler = None
+
+    profile_path = None
+    if profiler:
+        profiler.disable()
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        profile_path = os.path.join(PROFILE_DIR, f'rerun-{time.strftime("%Y%m%d-%H%M%S")}.prof')
+        profiler.dump_stats(profile_path)
+
+    write_metrics()
+    return spans, seconds, profile_path
+
+
+# Per-stage totals summed over the rerun's spans, slowest first
+def stage_breakdown(spans):
+    stages = {}
+    for record in spans:
+        stage = stages.setdefault(record['span'], {'stage': record['span'], 'calls': 0, 'seconds': 0.0, 'rows': 0})
+        stage['calls'] += 1
+        stage['seconds'] += record['seconds']
+        stage['rows'] += record.get('rows') or 0
+    return sorted(stages.values(), key=lambda stage: stage['seconds'], reverse=True)
+
+
+def prometheus_text():
+    with _metrics_lock:
+        totals = dict(_metrics)
+    lines = [
+        '# HELP github_stage_seconds_total Time spent in each instrumented stage.',
+        '# TYPE github_stage_seconds_total counter'
+    ]
+    lines += [f'github_stage_seconds_total{{stage="{name}"}} {seconds:.6f}' for name, (_, seconds, _) in totals.items()]
+    lines += ['# HELP github_stage_calls_total Calls of each instrumented stage.', '# TYPE github_stage_calls_total counter']
+    lines += [f'github_stage_calls_total{{stage="{name}"}} {calls}' for name, (calls, _, _) in totals.items()]
+    lines += ['# HELP github_stage_rows_total Rows processed by each instrumented stage.', '# TYPE github_stage_rows_total counter']
+    lines += [f'github_stage_rows_total{{stage="{name}"}} {rows}' for name, (_, _, rows) in totals.items()]
+    return '\n'.join(lines) + '\n'
+
+
+# Written atomically so a node_exporter textfile collector never reads a partial file
+def write_metrics():
+    if not METRICS_FILE:
+        return
+    with open(f'{METRICS_FILE}.tmp', 'w') as f:
+        f.write(prometheus_text())
+    os.replace(f'{METRICS_FILE}.tmp', METRICS_FILE)
@@ -0,0 +1,137 @@
+from sqlalchemy import Integer, String, and_, cast, column, delete, extract, func, insert, inspect, literal, select, table, text
+
+from github_data_dive.schema import (LANGUAGE_YEARS_TABLE, LICENSE_MIX_TABLE, OWNER_STATS_TABLE, TABLE_NAME, language_years,
+                                     license_mix, owner_stats, repositories)
+
+
+# Incremental maintenance of the cross-topic leaderboard tables.
+# Each write records the repositories it touches twice into a delta table: with sign -1 at their
+# values before the merge and +1 at their values after it. Summing the delta per group gives the
+# change to apply, so only the groups a batch's repositories leave or join are rewritten and the
+# repositories table is never rescanned. rebuild_leaderboards recomputes everything from scratch.
+
+DELTA_TABLE = f'{TABLE_NAME}_leaderboard_delta'
+DELTA_COLUMNS = ['Owner', 'Programming_Language', 'License_Type', 'Creation_Year', 'Number_of_Stars', 'Number_of_Forks', 'Sign']
+
+delta = table(DELTA_TABLE, *(column(name) for name in DELTA_COLUMNS))
+
+
+# Returns True when the tables did not exist yet, so the caller can backfill them
+def ensure_leaderboard_tables(conn):
+    created = not inspect(conn).has_table(OWNER_STATS_TABLE)
+    conn.execute(text(f'''
+        CREATE TABLE IF NOT EXISTS {OWNER_STATS_TABLE} (
+            "Owner" TEXT PRIMARY KEY, "Repository_Count" INTEGER NOT NULL,
+            "Total_Stars" BIGINT NOT NULL, "Total_Forks" BIGINT NOT NULL
+        )
+    '''))
+    conn.execute(text(f'CREATE INDEX IF NOT EXISTS {OWNER_STATS_TABLE}_stars ON {OWNER_STATS_TABLE} ("Total_Stars" DESC)'))
+    conn.execute(text(f'''
+        CREATE TABLE IF NOT EXISTS {LANGUAGE_YEARS_TABLE} (
+            "Programming_Language" TEXT NOT NULL, "Creation_Year" INTEGER NOT NULL, "Repository_Count" INTEGER NOT NULL,
+            PRIMARY KEY ("Programming_Language", "Creation_Year")
+        )
+    '''))
+    conn.execute(text(f'''
+        CREATE TABLE IF NOT EXISTS {LICENSE_MIX_TABLE} (
+            "Programming_Language" TEXT NOT NULL, "License_Type" TEXT NOT NULL, "Repository_Count" INTEGER NOT NULL,
+            PRIMARY KEY ("Programming_Language", "License_Type")
+        )
+    '''))
+    return created
+
+
+# One row per repository across topics: its largest counts, earliest creation date and the
+# greatest language/license among its topic rows. touched limits it to the given (Owner, Repository_Name) pairs.
+def repository_values(touched=None):
+    c = repositories.c
+    source = repositories
+    if touched is not None:
+        source = repositories.join(touched, and_(c.Owner == touched.c.Owner, c.Repository_Name == touched.c.Repository_Name))
+
+    return (select(c.Owner,
+                   func.max(c.Programming_Language).label('Programming_Language'),
+                   func.max(c.License_Type).label('License_Type'),
+                   func.min(c.Creation_Date).label('Creation_Date'),
+                   func.max(c.Number_of_Stars).label('Number_of_Stars'),
+                   func.max(c.Number_of_Forks).label('Number_of_Forks'))
+            .select_from(source)
+            .group_by(c.Owner, c.Repository_Name)
+            .subquery())
+
+
+# Append the current values of the staged repositories to the delta, multiplied by sign
+def record_delta(conn, staging, sign):
+    keys = table(staging, column('Owner', String), column('Repository_Name', String))
+    touched = select(keys.c.Owner, keys.c.Repository_Name).distinct().subquery()
+    r = repository_values(touched).c
+    conn.execute(insert(delta).from_select(DELTA_COLUMNS, select(
+        r.Owner, r.Programming_Language, r.License_Type, cast(extract('year', r.Creation_Date), Integer),
+        r.Number_of_Stars * sign, r.Number_of_Forks * sign, literal(sign)
+    )))
+
+
+# Called inside the write transaction before the staged batch is merged; the tables exist by then
+def start_delta(conn, staging):
+    conn.execute(text(f'''
+        CREATE TEMP TABLE {DELTA_TABLE} (
+            "Owner" TEXT, "Programming_Language" TEXT, "License_Type" TEXT, "Creation_Year" INTEGER,
+            "Number_of_Stars" BIGINT, "Number_of_Forks" BIGINT, "Sign" INTEGER
+        )
+    '''))
+    record_delta(conn, staging, -1)
+
+
+# Called after the merge: add the summed delta onto each touched group, then drop the groups left empty.
+# Groups whose delta sums to zero (repositories that did not change) are not written at all.
+# WHERE true disambiguates INSERT ... SELECT ... ON CONFLICT for SQLite
+def finish_delta(conn, staging):
+    record_delta(conn, staging, 1)
+
+    conn.execute(text(f'''
+        INSERT INTO {OWNER_STATS_TABLE} ("Owner", "Repository_Count", "Total_Stars", "Total_Forks")
+        SELECT "Owner", SUM("Sign"), SUM("Number_of_Stars"), SUM("Number_of_Forks") FROM {DELTA_TABLE} WHERE true
+        GROUP BY "Owner"
+        HAVING SUM("Sign") <> 0 OR SUM("Number_of_Stars") <> 0 OR SUM("Number_of_Forks") <> 0
+        ON CONFLICT ("Owner") DO UPDATE SET
+            "Repository_Count" = {OWNER_STATS_TABLE}."Repository_Count" + excluded."Repository_Count",
+            "Total_Stars" = {OWNER_STATS_TABLE}."Total_Stars" + excluded."Total_Stars",
+            "Total_Forks" = {OWNER_STATS_TABLE}."Total_Forks" + excluded."Total_Forks"
+    '''))
+    for target, group in [(LANGUAGE_YEARS_TABLE, '"Programming_Language", "Creation_Year"'),
+                          (LICENSE_MIX_TABLE, '"Programming_Language", "License_Type"')]:
+        conn.execute(text(f'''
+            INSERT INTO {target} ({group}, "Repository_Count")
+            SELECT {group}, SUM("Sign") FROM {DELTA_TABLE} WHERE true
+            GROUP BY {group}
+            HAVING SUM("Sign") <> 0
+            ON CONFLICT ({group}) DO UPDATE SET "Repository_Count" = {target}."Repository_Count" + excluded."Repository_Count"
+        '''))
+
+    conn.execute(text(f'DELETE FROM {OWNER_STATS_TABLE} WHERE "Repository_Count" <= 0 AND "Owner" IN (SELECT "Owner" FROM {DELTA_TABLE})'))
+    conn.execute(text(f'DELETE FROM {LANGUAGE_YEARS_TABLE} WHERE "Repository_Count" <= 0'))
+    conn.execute(text(f'DELETE FROM {LICENSE_MIX_TABLE} WHERE "Repository_Count" <= 0'))
+    conn.execute(text(f'DROP TABLE {DELTA_TABLE}'))
+
+
+# Full recomputation from the repositories table, used after a replace and to backfill new tables
+def rebuild_leaderboards(conn):
+    ensure_leaderboard_tables(conn)
+    r = repository_values().c
+    creation_year = cast(extract('year', r.Creation_Date), Integer)
+
+    conn.execute(delete(owner_stats))
+    conn.execute(insert(owner_stats).from_select(
+        ['Owner', 'Repository_Count', 'Total_Stars', 'Total_Forks'],
+        select(r.Owner, func.count(), func.sum(r.Number_of_Stars), func.sum(r.Number_of_Forks)).group_by(r.Owner)
+    ))
+    conn.execute(delete(language_years))
+    conn.execute(insert(language_years).from_select(
+        ['Programming_Language', 'Creation_Year', 'Repository_Count'],
+        select(r.Programming_Language, creation_year, func.count()).group_by(r.Programming_Language, creation_year)
+    ))
+    conn.execute(delete(license_mix))
+    conn.execute(insert(license_mix).from_select(
+        ['Programming_Language', 'License_Type', 'Repository_Count'],
+        select(r.Programming_Language, r.License_Type, func.count()).group_by(r.Programming_Language, r.License_Type)
+    ))
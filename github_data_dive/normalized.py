@@ -0,0 +1,103 @@
+from sqlalchemy import inspect, text
+
+from github_data_dive.schema import (CHANGE_COLUMNS, LANGUAGES_TABLE, LICENSES_TABLE, REPOS_TABLE, TABLE_NAME, TOPICS_TABLE,
+                                     quote_columns)
+
+
+# Writer side of the normalized layout (STORAGE_LAYOUT=normalized): one repos row per GitHub
+# repository, a (Topic, Repository_Id) membership table, dictionary tables for the language and
+# license names, and TABLE_NAME as a view joining them back into the flat table's columns.
+
+REPO_COLUMNS = ['Repository_Id', 'Repository_Name', 'Owner', 'Description', 'URL', 'Creation_Date',
+                'Last_Updated_Date', 'Number_of_Stars', 'Number_of_Forks', 'Number_of_Open_Issues']
+
+# Dictionary table, its id column and the flat column it replaces
+DICTIONARIES = [(LANGUAGES_TABLE, 'Language_Id', 'Programming_Language'), (LICENSES_TABLE, 'License_Id', 'License_Type')]
+
+
+# Runs once per process in its own transaction (store.prepare_storage)
+def ensure_normalized_tables(conn):
+    inspector = inspect(conn)
+    view_exists = TABLE_NAME in inspector.get_view_names()
+    if inspector.has_table(TABLE_NAME) and not view_exists:
+        raise RuntimeError(f"{TABLE_NAME} is a flat table; point TABLE_NAME at a new name to store it normalized")
+
+    postgres = conn.dialect.name == 'postgresql'
+    for dictionary, key, name in DICTIONARIES:
+        conn.execute(text(f'''
+            CREATE TABLE IF NOT EXISTS {dictionary} (
+                "{key}" {'SERIAL' if postgres else 'INTEGER'} PRIMARY KEY, "{name}" TEXT NOT NULL UNIQUE
+            )
+        '''))
+    conn.execute(text(f'''
+        CREATE TABLE IF NOT EXISTS {REPOS_TABLE} (
+            "Repository_Id" BIGINT PRIMARY KEY,
+            "Repository_Name" TEXT NOT NULL, "Owner" TEXT NOT NULL, "Description" TEXT, "URL" TEXT,
+            "Language_Id" INTEGER NOT NULL REFERENCES {LANGUAGES_TABLE} ("Language_Id"),
+            "License_Id" INTEGER NOT NULL REFERENCES {LICENSES_TABLE} ("License_Id"),
+            "Creation_Date" DATE, "Last_Updated_Date" DATE,
+            "Number_of_Stars" INTEGER, "Number_of_Forks" INTEGER, "Number_of_Open_Issues" INTEGER
+        )
+    '''))
+    conn.execute(text(f'''
+        CREATE TABLE IF NOT EXISTS {TOPICS_TABLE} (
+            "Topic" TEXT NOT NULL,
+            "Repository_Id" BIGINT NOT NULL REFERENCES {REPOS_TABLE} ("Repository_Id"),
+            PRIMARY KEY ("Topic", "Repository_Id")
+        )
+    '''))
+    conn.execute(text(f'CREATE INDEX IF NOT EXISTS {TOPICS_TABLE}_repository ON {TOPICS_TABLE} ("Repository_Id")'))
+
+    # Same columns, in the same order, as the flat table. Only created when missing: replacing a view
+    # takes an exclusive lock on PostgreSQL that blocks every read through it
+    if view_exists:
+        return
+    conn.execute(text(f'''
+        CREATE VIEW {TABLE_NAME} AS
+        SELECT m."Topic", r."Repository_Name", r."Owner", r."Description", r."URL", l."Programming_Language",
+               r."Creation_Date", r."Last_Updated_Date", r."Number_of_Stars", r."Number_of_Forks",
+               r."Number_of_Open_Issues", c."License_Type", r."Repository_Id"
+        FROM {TOPICS_TABLE} m
+        JOIN {REPOS_TABLE} r ON r."Repository_Id" = m."Repository_Id"
+        JOIN {LANGUAGES_TABLE} l ON l."Language_Id" = r."Language_Id"
+        JOIN {LICENSES_TABLE} c ON c."License_Id" = r."License_Id"
+    '''))
+
+
+# Merge two staging tables shaped like the flat table: staging holds the batch's (topic, repository)
+# rows, repos_staging one row per repository in it. New dictionary names are added first, then
+# repositories are inserted or, when their counts or dates changed, updated, and memberships added.
+# WHERE true disambiguates INSERT ... SELECT ... ON CONFLICT for SQLite
+def merge_normalized(conn, staging, repos_staging):
+    for dictionary, key, name in DICTIONARIES:
+        conn.execute(text(f'''
+            INSERT INTO {dictionary} ("{name}")
+            SELECT DISTINCT "{name}" FROM {repos_staging} WHERE true
+            ON CONFLICT ("{name}") DO NOTHING
+        '''))
+
+    updates = ", ".join(f'"{column}" = excluded."{column}"' for column in REPO_COLUMNS[1:] + ['Language_Id', 'License_Id'])
+    changed = " OR ".join(f'{REPOS_TABLE}."{column}" IS DISTINCT FROM excluded."{column}"'
+                          for column in CHANGE_COLUMNS + ['Language_Id', 'License_Id'])
+    conn.execute(text(f'''
+        INSERT INTO {REPOS_TABLE} ({quote_columns(REPO_COLUMNS)}, "Language_Id", "License_Id")
+        SELECT {", ".join(f's."{column}"' for column in REPO_COLUMNS)}, l."Language_Id", c."License_Id"
+        FROM {repos_staging} s
+        JOIN {LANGUAGES_TABLE} l ON l."Programming_Language" = s."Programming_Language"
+        JOIN {LICENSES_TABLE} c ON c."License_Type" = s."License_Type"
+        WHERE true
+        ON CONFLICT ("Repository_Id") DO UPDATE SET {updates}
+        WHERE {changed}
+    '''))
+
+    conn.execute(text(f'''
+        INSERT INTO {TOPICS_TABLE} ("Topic", "Repository_Id")
+        SELECT DISTINCT "Topic", "Repository_Id" FROM {staging} WHERE true
+        ON CONFLICT ("Topic", "Repository_Id") DO NOTHING
+    '''))
+
+
+# Replace mode: drop every membership and repository; the dictionaries are kept
+def clear_normalized(conn):
+    conn.execute(text(f'DELETE FROM {TOPICS_TABLE}'))
+    conn.execute(text(f'DELETE FROM {REPOS_TABLE}'))
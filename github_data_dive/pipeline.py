@@ -0,0 +1,209 @@
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from github_data_dive.clean import clean_repository_data
+from github_data_dive.fetch import PER_PAGE, RequestScheduler, api_url, harvest_topics
+from github_data_dive.store import finalize_topics, store_data
+
+
+# Staged ingest: fetch threads -> a process pool cleaning batches -> one writer storing them.
+# HTTP, pandas cleaning and database writes overlap instead of running in turn, and cleaning
+# runs on every core instead of behind the GIL. The stages are joined by bounded queues, so a
+# slow stage blocks the one before it rather than letting batches pile up in memory.
+#   CLEAN_WORKERS         processes cleaning batches (default: one per core)
+#   PIPELINE_QUEUE_SIZE   batches each queue holds before its producer blocks (default: 2 per clean worker)
+CLEAN_WORKERS = int(os.getenv('CLEAN_WORKERS', '0')) or os.cpu_count() or 1
+QUEUE_SIZE = int(os.getenv('PIPELINE_QUEUE_SIZE', '0')) or 2 * CLEAN_WORKERS
+
+# Marks the end of the stream on every queue
+STOP = None
+
+
+class PipelineStopped(Exception):
+    pass
+
+
+# Bounded queue that records how full it runs and how long producers waited on it.
+# Every wait gives up once stop is set, so no stage hangs on a stage that already failed.
+class StageQueue:
+    def __init__(self, maxsize, stop):
+        self.queue = queue.Queue(maxsize)
+        self.stop = stop
+        self.puts = 0
+        self.depth_total = 0
+        self.max_depth = 0
+        self.blocked_seconds = 0.0
+
+    def put(self, item):
+        started = time.perf_counter()
+        while True:
+            if self.stop.is_set():
+                raise PipelineStopped()
+            try:
+                self.queue.put(item, timeout=0.1)
+                break
+            except queue.Full:
+                pass
+
+        depth = self.queue.qsize()
+        with self.queue.mutex:
+            self.blocked_seconds += time.perf_counter() - started
+            self.puts += 1
+            self.depth_total += depth
+            self.max_depth = max(self.max_depth, depth)
+
+    def get(self):
+        while True:
+            if self.stop.is_set():
+                raise PipelineStopped()
+            try:
+                return self.queue.get(timeout=0.1)
+            except queue.Empty:
+                pass
+
+    def stats(self):
+        return {'capacity': self.queue.maxsize, 'max_depth': self.max_depth,
+                'mean_depth': self.depth_total / self.puts if self.puts else 0.0,
+                'blocked_seconds': self.blocked_seconds}
+
+
+# forkserver/spawn workers start from a clean interpreter, never from a fork of a process running threads
+def clean_pool(workers=CLEAN_WORKERS):
+    method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(method))
+
+
+# Runs in a pool process; returns the cleaned batch and the seconds spent cleaning it
+def clean_batch(df):
+    started = time.perf_counter()
+    cleaned = clean_repository_data(df)
+    return cleaned, time.perf_counter() - started
+
+
+def stage_stats(rows, batches, seconds, wall):
+    return {'batches': batches, 'rows': rows, 'seconds': seconds,
+            'rows_per_sec': rows / seconds if seconds else 0.0, 'utilization': seconds / wall if wall else 0.0}
+
+
+# Fetch, clean and store the topics through the staged pipeline.
+# on_done(topic) is called once a topic's batches are stored and finalized, and stats['topics']
+# holds each topic's stored rows, changed (inserted or updated) rows, fetched pages, whether its
+# fetch reached the last result page and the last creation date it walked in full. Pass a long-lived pool to skip starting worker processes on
+# every run. Topics whose fetch fails are reported in stats['errors']; a failing clean or write
+# stops every stage and is raised.
+def run_pipeline(topics, fetch_workers=8, clean_workers=CLEAN_WORKERS, queue_size=QUEUE_SIZE, max_pages=None,
+                 scheduler=None, url=api_url, batch_rows=PER_PAGE, since=None, created_after=None, on_done=None, pool=None):
+    stop = threading.Event()
+    # Rate-limit waits end on stop too, so an interrupt never waits out a throttle
+    scheduler = (scheduler or RequestScheduler(max_concurrency=fetch_workers)).with_stop(stop)
+    fetched = StageQueue(queue_size, stop)
+    cleaned = StageQueue(queue_size, stop)
+    failures = []
+    stats = {}
+
+    # Stage 1: fetch threads hand raw batches to the fetched queue, blocking while it is full
+    def fetch():
+        try:
+            stats.update(harvest_topics(topics, lambda topic, df: fetched.put(('page', topic, df)), max_workers=fetch_workers,
+                                        max_pages=max_pages, scheduler=scheduler, url=url,
+                                        on_done=lambda topic: fetched.put(('done', topic, None)),
+                                        batch_rows=batch_rows, since=since, created_after=created_after))
+            fetched.put(STOP)
+        except PipelineStopped:
+            pass
+        except Exception as exc:
+            failures.append(exc)
+            stop.set()
+
+    # Stage 2: submit each batch to the pool and pass its future on in order; the bounded
+    # cleaned queue caps the batches in flight in the pool
+    def dispatch():
+        try:
+            while True:
+                item = fetched.get()
+                if item is STOP:
+                    cleaned.put(STOP)
+                    return
+                kind, topic, df = item
+                if kind == 'page':
+                    cleaned.put((kind, topic, workers.submit(clean_batch, df), df.attrs.get('pages', 1)))
+                else:
+                    cleaned.put((kind, topic, None, 0))
+        except PipelineStopped:
+            pass
+        except Exception as exc:
+            failures.append(exc)
+            stop.set()
+
+    workers = pool or clean_pool(clean_workers)
+    threads = [threading.Thread(target=fetch, name='pipeline-fetch', daemon=True),
+               threading.Thread(target=dispatch, name='pipeline-dispatch', daemon=True)]
+    counts = {'inserted': 0, 'updated': 0, 'unchanged': 0}
+    per_topic = {}
+    clean_rows = clean_batches = 0
+    clean_seconds = store_seconds = finalize_seconds = 0.0
+
+    # Stage 3: this thread is the single writer; batches are stored in the order they were fetched
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    try:
+        while True:
+            item = cleaned.get()
+            if item is STOP:
+                break
+            kind, topic, future, pages = item
+            if kind == 'done':
+                finalize_started = time.perf_counter()
+                finalize_topics([topic])
+                finalize_seconds += time.perf_counter() - finalize_started
+                if on_done:
+                    on_done(topic)
+                continue
+
+            df, seconds = future.result()
+            clean_rows += len(df)
+            clean_batches += 1
+            clean_seconds += seconds
+
+            store_started = time.perf_counter()
+            stored = store_data(df, finalize=False)
+            store_seconds += time.perf_counter() - store_started
+            for key in counts:
+                counts[key] += stored[key]
+            topic_counts = per_topic.setdefault(topic, {'rows': 0, 'changed': 0, 'fetched_pages': 0})
+            topic_counts['rows'] += len(df)
+            topic_counts['changed'] += stored['inserted'] + stored['updated']
+            topic_counts['fetched_pages'] += pages
+    except PipelineStopped:
+        pass
+    finally:
+        # Graceful shutdown, also on an interrupt: wake every blocked stage, then drop the batches not yet cleaned
+        stop.set()
+        for thread in threads:
+            thread.join()
+        if pool is None:
+            workers.shutdown(cancel_futures=True)
+
+    if failures:
+        raise failures[0]
+
+    wall = time.perf_counter() - started
+    for topic, complete in stats['complete'].items():
+        topic_counts = per_topic.setdefault(topic, {'rows': 0, 'changed': 0, 'fetched_pages': 0})
+        topic_counts['complete'] = complete
+        topic_counts['created_through'] = stats['created_through'][topic]
+    stats.update(counts)
+    stats['topics'] = per_topic
+    stats['seconds'] = wall
+    stats['stages'] = {
+        'fetch': stage_stats(stats['repositories'], stats['pages'], stats['fetch_seconds'], wall * fetch_workers),
+        'clean': stage_stats(clean_rows, clean_batches, clean_seconds, wall * clean_workers),
+        'store': stage_stats(clean_rows, clean_batches, store_seconds + finalize_seconds, wall)
+    }
+    stats['queues'] = {'fetched': fetched.stats(), 'cleaned': cleaned.stats()}
+    return stats
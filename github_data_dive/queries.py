@@ -0,0 +1,481 @@
+import functools
+import os
+from datetime import date, timedelta
+from urllib.parse import unquote
+
+import pandas as pd
+from sqlalchemy import extract, func, inspect, select, text
+from sqlalchemy.exc import SQLAlchemyError
+
+from github_data_dive.clean import COUNT_COLUMNS, DATE_COLUMNS, compact_dtypes
+from github_data_dive.database import get_async_reader, get_read_engine, read_frames
+from github_data_dive.schema import (HISTORY_TABLE, KEY_COLUMNS, REPOSITORY_IDS_TABLE, SEARCH_DOCUMENT, SNAPSHOT_DIR,
+                                     SNAPSHOT_STAGING_SUFFIXES, TABLE_NAME, language_years, license_mix, owner_stats,
+                                     repositories, rollups)
+
+
+# Read side of the explorer: every query a render issues, uncached.
+# The Streamlit shell wraps these in st.cache_data; scripts and benchmarks call them directly.
+
+# Set DATA_SOURCE=snapshot to serve the explorer from the Parquet snapshot written at ingest
+DATA_SOURCE = os.getenv('DATA_SOURCE', 'database')
+
+FILTER_COLUMNS = ['Programming_Language', 'Creation_Date', 'Last_Updated_Date', 'Number_of_Stars']
+SEARCH_PAGE_SIZE = 20
+
+# Bars drawn per chart before the rest is summed into one "other" bar
+MAX_CHART_ROWS = int(os.getenv('MAX_CHART_ROWS', '50'))
+
+
+# Reads go to the replica when one is configured. The read path never runs DDL: the explorer's
+# indexes and the pg_trgm extension are created by the loader, in store.prepare_storage.
+def read_engine():
+    return get_read_engine()
+
+
+def has_table():
+    if DATA_SOURCE == 'snapshot':
+        return os.path.isdir(SNAPSHOT_DIR)
+    return inspect(read_engine()).has_table(TABLE_NAME)
+
+
+# Load data from the PostgreSQL database
+def load_data():
+    if DATA_SOURCE == 'snapshot':
+        return snapshot_repositories()
+
+    query = select(repositories)
+    df = compact_dtypes(pd.read_sql(query, read_engine(), parse_dates=DATE_COLUMNS))
+
+    df.index = df.index + 1
+    df.index.name = 'ID'
+
+    return df
+
+
+# Turn the sidebar selections into WHERE clauses; years become index-friendly date ranges.
+# topic may be a list: several topics are then read in one query, which the normalized layout
+# answers as an indexed join through its topic membership table.
+def filter_conditions(topic=None, language='Default', creation_year='Default', updated_year='Default', min_stars=None):
+    c = repositories.c
+    conditions = []
+
+    if isinstance(topic, (list, tuple)):
+        conditions.append(c.Topic.in_(topic))
+    elif topic:
+        conditions.append(c.Topic == topic)
+    if language != 'Default':
+        conditions.append(c.Programming_Language == language)
+    if creation_year != 'Default':
+        year = int(creation_year)
+        conditions += [c.Creation_Date >= date(year, 1, 1), c.Creation_Date < date(year + 1, 1, 1)]
+    if updated_year != 'Default':
+        year = int(updated_year)
+        conditions += [c.Last_Updated_Date >= date(year, 1, 1), c.Last_Updated_Date < date(year + 1, 1, 1)]
+    if min_stars is not None:
+        conditions.append(c.Number_of_Stars >= int(min_stars))
+
+    return conditions
+
+
+# Snapshot read mode: topic partitions of the Parquet snapshot replace the SQL queries,
+# so the dashboard can start and run without a database connection
+def snapshot_topics():
+    return sorted(unquote(name.split('=', 1)[1]) for name in os.listdir(SNAPSHOT_DIR)
+                  if name.startswith('Topic=') and not name.endswith(SNAPSHOT_STAGING_SUFFIXES))
+
+
+# Read one topic partition, pruned to the requested columns
+def read_snapshot(topic=None, columns=None):
+    if isinstance(topic, (list, tuple)):
+        filters = [('Topic', 'in', list(topic))]
+    else:
+        filters = [('Topic', '==', topic)] if topic else None
+    df = pd.read_parquet(SNAPSHOT_DIR, columns=columns, filters=filters, memory_map=True)
+
+    # The partition column is appended last; restore the table's column order
+    df = df[[name for name in repositories.c.keys() if name in df.columns]]
+    return compact_dtypes(df)
+
+
+# The pandas equivalent of filter_conditions for snapshot frames
+def filter_frame(df, topic=None, language='Default', creation_year='Default', updated_year='Default', min_stars=None):
+    mask = pd.Series(True, index=df.index)
+
+    if language != 'Default':
+        mask &= df['Programming_Language'] == language
+    if creation_year != 'Default':
+        mask &= df['Creation_Date'].dt.year == int(creation_year)
+    if updated_year != 'Default':
+        mask &= df['Last_Updated_Date'].dt.year == int(updated_year)
+    if min_stars is not None:
+        mask &= df['Number_of_Stars'] >= int(min_stars)
+
+    return df[mask]
+
+
+def snapshot_filter_options(topic):
+    df = read_snapshot(topic, ['Programming_Language', 'Creation_Date', 'Last_Updated_Date'])
+    return {
+        'languages': sorted(df['Programming_Language'].unique().tolist()),
+        'creation_years': sorted(df['Creation_Date'].dt.year.unique().tolist()),
+        'updated_years': sorted(df['Last_Updated_Date'].dt.year.unique().tolist(), reverse=True)
+    }
+
+
+def snapshot_star_range(**selection):
+    df = filter_frame(read_snapshot(selection.get('topic'), FILTER_COLUMNS), **selection)
+    if df.empty:
+        return None, None, 0
+    return int(df['Number_of_Stars'].min()), int(df['Number_of_Stars'].max()), len(df)
+
+
+# Same order as repositories_query: descending order_by, ties broken by the unique key
+def sort_repositories(df, order_by):
+    return df.sort_values([order_by] + KEY_COLUMNS, ascending=[False] + [True] * len(KEY_COLUMNS), kind='stable')
+
+
+def snapshot_repositories(columns=None, order_by='Number_of_Stars', limit=None, offset=0, **selection):
+    needed = list(dict.fromkeys(columns + FILTER_COLUMNS + [order_by] + KEY_COLUMNS)) if columns else None
+    df = sort_repositories(filter_frame(read_snapshot(selection.get('topic'), needed), **selection), order_by)
+    if limit is not None:
+        df = df.iloc[offset:offset + limit]
+    if columns:
+        df = df[columns]
+
+    df = df.reset_index(drop=True)
+    df.index = df.index + 1
+    df.index.name = 'ID'
+
+    return df
+
+
+def load_topics():
+    if DATA_SOURCE == 'snapshot':
+        return snapshot_topics()
+
+    query = select(repositories.c.Topic).distinct().order_by(repositories.c.Topic)
+    with read_engine().connect() as conn:
+        return list(conn.execute(query).scalars())
+
+
+# Options for the dependent sidebar widgets, computed in the database
+def load_filter_options(topic):
+    if DATA_SOURCE == 'snapshot':
+        return snapshot_filter_options(topic)
+
+    c = repositories.c
+    conditions = filter_conditions(topic)
+    creation_year = extract('year', c.Creation_Date).label('year')
+    updated_year = extract('year', c.Last_Updated_Date).label('year')
+
+    # The three lists are independent, so they are queried concurrently
+    languages, creation_years, updated_years = raise_failed(read_frames(read_engine(), [
+        select(c.Programming_Language).distinct().where(*conditions).order_by(c.Programming_Language),
+        select(creation_year).distinct().where(*conditions),
+        select(updated_year).distinct().where(*conditions)
+    ], get_async_reader()))
+
+    return {
+        'languages': list(languages['Programming_Language']),
+        'creation_years': sorted(int(year) for year in creation_years['year']),
+        'updated_years': sorted((int(year) for year in updated_years['year']), reverse=True)
+    }
+
+
+# Minimum/maximum star counts for the star slider under the current selection
+def load_star_range(**selection):
+    if DATA_SOURCE == 'snapshot':
+        return snapshot_star_range(**selection)
+
+    stars = repositories.c.Number_of_Stars
+    query = select(func.min(stars), func.max(stars), func.count()).where(*filter_conditions(**selection))
+    with read_engine().connect() as conn:
+        return tuple(conn.execute(query).one())
+
+
+# Fetch only the rows and columns the current view needs, ordered and limited in SQL
+def query_repositories(columns=None, order_by='Number_of_Stars', limit=None, offset=0, **selection):
+    if DATA_SOURCE == 'snapshot':
+        return snapshot_repositories(columns, order_by, limit, offset, **selection)
+
+    return repository_frame(pd.read_sql(repositories_query(columns, order_by, limit, offset, **selection), read_engine()))
+
+
+# Order by order_by, then by the unique key, so LIMIT/OFFSET pages never repeat or skip tied rows
+def repositories_query(columns=None, order_by='Number_of_Stars', limit=None, offset=0, **selection):
+    c = repositories.c
+    selected = [c[name] for name in columns] if columns else [repositories]
+    query = (select(*selected)
+             .where(*filter_conditions(**selection))
+             .order_by(c[order_by].desc(), *(c[name] for name in KEY_COLUMNS)))
+    if limit is not None:
+        query = query.limit(limit).offset(offset)
+    return query
+
+
+# Parse the date columns once here so the views never re-parse them
+def repository_frame(df):
+    for name in DATE_COLUMNS:
+        if name in df.columns:
+            df[name] = pd.to_datetime(df[name])
+    df = compact_dtypes(df)
+
+    df.index = df.index + 1
+    df.index.name = 'ID'
+
+    return df
+
+
+# Results of read_frames for queries that have no fallback
+def raise_failed(results):
+    for result in results:
+        if isinstance(result, Exception):
+            raise result
+    return results
+
+
+# The rollup covers every selection except the last-updated year and a star threshold
+def load_rollup(topic=None, language='Default', creation_year='Default', updated_year='Default', min_stars=None):
+    if DATA_SOURCE == 'snapshot' or updated_year != 'Default' or min_stars is not None:
+        return None
+
+    try:
+        return pd.read_sql(rollup_query(topic, language, creation_year), read_engine())
+    except SQLAlchemyError:
+        return None
+
+
+def rollup_query(topic=None, language='Default', creation_year='Default'):
+    c = rollups.c
+    conditions = []
+    if topic:
+        conditions.append(c.Topic == topic)
+    if language != 'Default':
+        conditions.append(c.Programming_Language == language)
+    if creation_year != 'Default':
+        conditions.append(c.Creation_Year == int(creation_year))
+    return select(rollups).where(*conditions)
+
+
+# Repository counts per chart dimension, served from the rollup when the selection is covered
+def repository_counts(filtered_data, rollup, by):
+    if rollup is not None:
+        return rollup.groupby(by)['Repository_Count'].sum().reset_index()
+    return filtered_data.groupby(by, observed=True).size().reset_index(name='Repository_Count')
+
+
+# Bars for a metric from its top-N frame; when the selection holds more repositories than that,
+# the rest is summed into one "other" bar from the metric's total over the selection
+def top_repositories(top, metric, count, total):
+    top = top[['Repository_Name', metric]].reset_index(drop=True)
+    if count <= len(top):
+        return top
+
+    other = pd.DataFrame({
+        'Repository_Name': [f'other ({count - len(top)} repositories)'],
+        metric: [total - top[metric].sum()]
+    })
+    return pd.concat([top, other], ignore_index=True)
+
+
+# Columns of each metric's top-N frame; the stars frame also feeds the stars and forks comparison
+def top_columns(metric):
+    return ['Repository_Name', metric] + (['Number_of_Forks'] if metric == 'Number_of_Stars' else [])
+
+
+# Columns the charts read over every selected row: stars for the histogram, plus the count
+# dimensions when no rollup serves them
+def chart_columns(dimensions):
+    return ['Number_of_Stars'] + (['Programming_Language', 'License_Type', 'Creation_Date'] if dimensions else [])
+
+
+# In-process fallback index for snapshot mode; callers keep it around across searches
+def build_search_index(topic=None):
+    from github_data_dive.search import SearchIndex
+
+    return SearchIndex(read_snapshot(topic))
+
+
+# similarity() and % come from pg_trgm, which the loader may not have been allowed to create
+@functools.lru_cache(maxsize=None)
+def has_trigram():
+    with read_engine().connect() as conn:
+        return conn.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")).first() is not None
+
+
+# Ranked, paginated search hits: full-text rank plus name similarity, or full-text rank alone without pg_trgm
+def search_repositories(query, topic=None, limit=SEARCH_PAGE_SIZE, offset=0):
+    if DATA_SOURCE == 'snapshot':
+        return build_search_index(topic).search(query, limit, offset)
+
+    params = {'query': query, 'limit': limit, 'offset': offset}
+    topic_filter = ''
+    if topic:
+        topic_filter = 'AND "Topic" = :topic'
+        params['topic'] = topic
+
+    rank, match = f'ts_rank({SEARCH_DOCUMENT}, q)', f'{SEARCH_DOCUMENT} @@ q'
+    if has_trigram():
+        rank, match = f'{rank} + similarity("Repository_Name", :query)', f'{match} OR "Repository_Name" % :query'
+
+    statement = text(f'''
+        SELECT {TABLE_NAME}.*, {rank} AS "Rank"
+        FROM {TABLE_NAME}, websearch_to_tsquery('simple', :query) AS q
+        WHERE ({match}) {topic_filter}
+        ORDER BY "Rank" DESC
+        LIMIT :limit OFFSET :offset
+    ''')
+    df = compact_dtypes(pd.read_sql(statement, read_engine(), params=params, parse_dates=DATE_COLUMNS))
+
+    df.index = df.index + 1
+    df.index.name = 'ID'
+
+    return df
+
+
+# Observations of one repository, oldest first; empty when no history has been recorded
+def load_history(owner, repository_name):
+    if DATA_SOURCE == 'snapshot':
+        return pd.DataFrame()
+
+    statement = text(f'''
+        SELECT h."Observed_On", h."Number_of_Stars", h."Number_of_Forks", h."Number_of_Open_Issues"
+        FROM {HISTORY_TABLE} h
+        JOIN {REPOSITORY_IDS_TABLE} i ON i."Repo_ID" = h."Repo_ID"
+        WHERE i."Owner" = :owner AND i."Repository_Name" = :name
+        ORDER BY h."Observed_On"
+    ''')
+    try:
+        return pd.read_sql(statement, read_engine(), params={'owner': owner, 'name': repository_name}, parse_dates=['Observed_On'])
+    except SQLAlchemyError:
+        return pd.DataFrame()
+
+
+# Star growth over the last `days` days for the repositories of a topic, fastest rising first.
+# Each lookup is a primary-key probe on (Repo_ID, Observed_On), so it stays fast over a year of history.
+def load_fastest_rising(topic, days=30, limit=10):
+    if DATA_SOURCE == 'snapshot':
+        return pd.DataFrame()
+
+    try:
+        return pd.read_sql(fastest_rising_query(topic, days, limit), read_engine())
+    except SQLAlchemyError:
+        return pd.DataFrame()
+
+
+def fastest_rising_query(topic, days=30, limit=10):
+    statement = text(f'''
+        SELECT "Owner", "Repository_Name", current_stars AS "Number_of_Stars",
+               current_stars - COALESCE(past_stars, first_stars) AS "Star_Growth",
+               CAST(current_stars - COALESCE(past_stars, first_stars) AS FLOAT) / :days AS "Stars_per_Day"
+        FROM (
+            SELECT t."Owner", t."Repository_Name",
+                (SELECT h."Number_of_Stars" FROM {HISTORY_TABLE} h WHERE h."Repo_ID" = i."Repo_ID"
+                 ORDER BY h."Observed_On" DESC LIMIT 1) AS current_stars,
+                (SELECT h."Number_of_Stars" FROM {HISTORY_TABLE} h WHERE h."Repo_ID" = i."Repo_ID" AND h."Observed_On" <= :cutoff
+                 ORDER BY h."Observed_On" DESC LIMIT 1) AS past_stars,
+                (SELECT h."Number_of_Stars" FROM {HISTORY_TABLE} h WHERE h."Repo_ID" = i."Repo_ID"
+                 ORDER BY h."Observed_On" LIMIT 1) AS first_stars
+            FROM {TABLE_NAME} t
+            JOIN {REPOSITORY_IDS_TABLE} i ON i."Owner" = t."Owner" AND i."Repository_Name" = t."Repository_Name"
+            WHERE t."Topic" = :topic
+        ) growth
+        WHERE current_stars IS NOT NULL
+        ORDER BY "Star_Growth" DESC
+        LIMIT :limit
+    ''')
+    return statement.bindparams(topic=topic, days=days, cutoff=date.today() - timedelta(days=days), limit=limit)
+
+
+# Cross-topic leaderboards, read from the small tables the leaderboards module maintains at ingest.
+# They are empty in snapshot mode and before the first write.
+def load_owner_leaderboard(limit=20):
+    if DATA_SOURCE == 'snapshot':
+        return pd.DataFrame()
+
+    try:
+        return pd.read_sql(select(owner_stats).order_by(owner_stats.c.Total_Stars.desc()).limit(limit), read_engine())
+    except SQLAlchemyError:
+        return pd.DataFrame()
+
+
+# Keep the `limit` largest groups of a column by Repository_Count and fold the rest into "other"
+def top_groups(df, name, limit, by):
+    top = df.groupby(name)['Repository_Count'].sum().nlargest(limit).index
+    df = df.assign(**{name: df[name].where(df[name].isin(top), 'other')})
+    return df.groupby([name] + by, as_index=False)['Repository_Count'].sum()
+
+
+# Share of each language among the repositories created in each year
+def load_language_trend(limit=8):
+    if DATA_SOURCE == 'snapshot':
+        return pd.DataFrame()
+
+    try:
+        df = pd.read_sql(select(language_years), read_engine())
+    except SQLAlchemyError:
+        return pd.DataFrame()
+    if df.empty:
+        return df
+
+    df = top_groups(df, 'Programming_Language', limit, ['Creation_Year']).sort_values(['Creation_Year', 'Programming_Language'])
+    df['Share'] = df['Repository_Count'] / df.groupby('Creation_Year')['Repository_Count'].transform('sum')
+    return df
+
+
+# License mix of the most common languages
+def load_license_mix(limit=10):
+    if DATA_SOURCE == 'snapshot':
+        return pd.DataFrame()
+
+    try:
+        df = pd.read_sql(select(license_mix), read_engine())
+    except SQLAlchemyError:
+        return pd.DataFrame()
+    if df.empty:
+        return df
+
+    df = top_groups(df, 'Programming_Language', limit, ['License_Type'])
+    df['Share'] = df['Repository_Count'] / df.groupby('Programming_Language')['Repository_Count'].transform('sum')
+    return df
+
+
+# Everything Topic_Visuals draws for a selection except the table page, which the table queries
+# one page at a time: the repository count and metric totals, the top MAX_CHART_ROWS repositories
+# per bar chart (ORDER BY/LIMIT in SQL), the few columns the other charts read over every row, the
+# rollup and the fastest risers. The queries are independent and run concurrently on the pool
+# (or through asyncpg with DB_ASYNC=1), so a render waits for the slowest, not the sum.
+# Returns {'count', 'totals', 'top', 'charted', 'rollup', 'rising'}; totals and top are keyed by metric.
+def load_topic_page(**selection):
+    if DATA_SOURCE == 'snapshot':
+        df = snapshot_repositories(**selection)
+        return {'count': len(df), 'totals': {metric: int(df[metric].sum()) for metric in COUNT_COLUMNS},
+                'top': {metric: sort_repositories(df, metric).head(MAX_CHART_ROWS)[top_columns(metric)] for metric in COUNT_COLUMNS},
+                'charted': df[chart_columns(True)], 'rollup': None, 'rising': pd.DataFrame()}
+
+    topic = selection.get('topic')
+    c = repositories.c
+    rollup_covered = selection.get('updated_year', 'Default') == 'Default' and selection.get('min_stars') is None
+    statements = [
+        select(func.count().label('count'), *(func.coalesce(func.sum(c[metric]), 0).label(metric) for metric in COUNT_COLUMNS))
+        .where(*filter_conditions(**selection)),
+        repositories_query(chart_columns(not rollup_covered), **selection),
+        fastest_rising_query(topic)
+    ]
+    statements += [repositories_query(top_columns(metric), metric, MAX_CHART_ROWS, **selection) for metric in COUNT_COLUMNS]
+    if rollup_covered:
+        statements.append(rollup_query(topic, selection.get('language', 'Default'), selection.get('creation_year', 'Default')))
+
+    totals, charted, rising, *rest = read_frames(read_engine(), statements, get_async_reader())
+    top, rollup = rest[:len(COUNT_COLUMNS)], rest[len(COUNT_COLUMNS):]
+    raise_failed([totals, charted] + top)
+    rollup = rollup[0] if rollup and not isinstance(rollup[0], Exception) else None
+    if rollup is None and rollup_covered:
+        charted = pd.read_sql(repositories_query(chart_columns(True), **selection), read_engine())
+    if isinstance(rising, Exception):
+        rising = pd.DataFrame()
+
+    totals = totals.iloc[0]
+    return {'count': int(totals['count']), 'totals': {metric: int(totals[metric]) for metric in COUNT_COLUMNS},
+            'top': dict(zip(COUNT_COLUMNS, top)), 'charted': repository_frame(charted), 'rollup': rollup, 'rising': rising}
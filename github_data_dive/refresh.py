@@ -0,0 +1,215 @@
+import math
+import os
+import time
+from datetime import date, datetime, timezone
+
+from sqlalchemy import inspect, text
+
+from github_data_dive.database import get_engine
+from github_data_dive.fetch import PER_PAGE, SEARCH_RESULT_CAP, api_url
+from github_data_dive.pipeline import CLEAN_WORKERS, run_pipeline
+from github_data_dive.schema import REFRESH_STATE_TABLE, quote_columns
+
+
+# Incremental refresh: each run spends a global page budget on the topics most likely to have
+# changed, and asks the search API only for repositories pushed since the topic's last complete
+# fetch. Per-topic state (last fetch, watermark, observed churn) lives in REFRESH_STATE_TABLE.
+# A full fetch the budget cuts short saves a resume cursor, the last creation date it walked in full,
+# and the next run continues from there instead of starting over at page 1.
+# Times are epoch seconds from an injectable clock, so a run can be replayed with a fake clock.
+#   REFRESH_REQUEST_BUDGET      result pages fetched per run, across every topic
+#   REFRESH_STALE_AFTER_HOURS   a topic with no observed churn is refreshed after this long
+#   REFRESH_FULL_DAYS           days between full refetches, which pick up star changes on unpushed repositories
+REQUEST_BUDGET = int(os.getenv('REFRESH_REQUEST_BUDGET', '300'))
+STALE_AFTER_HOURS = float(os.getenv('REFRESH_STALE_AFTER_HOURS', '24'))
+FULL_REFRESH_DAYS = float(os.getenv('REFRESH_FULL_DAYS', '7'))
+
+# Weight of the latest fetch in the smoothed churn rate
+CHURN_SMOOTHING = 0.5
+
+# Pages of the largest single search query; a full fetch given fewer may not finish any created: range
+RANGE_PAGES = SEARCH_RESULT_CAP // PER_PAGE
+
+STATE_COLUMNS = ['Topic', 'Last_Fetched_At', 'Watermark', 'Last_Full_At', 'Full_Pages', 'Fetched_Rows', 'Changed_Rows', 'Churn_Rate',
+                 'Resume_After', 'Resume_Started_At', 'Resume_Pages']
+
+# Cursor columns added after the table first shipped
+RESUME_COLUMNS = {'Resume_After': 'TEXT', 'Resume_Started_At': 'DOUBLE PRECISION', 'Resume_Pages': 'INTEGER'}
+
+
+def ensure_state_table(conn):
+    conn.execute(text(f'''
+        CREATE TABLE IF NOT EXISTS {REFRESH_STATE_TABLE} (
+            "Topic" TEXT PRIMARY KEY,
+            "Last_Fetched_At" DOUBLE PRECISION NOT NULL,
+            "Watermark" DOUBLE PRECISION,
+            "Last_Full_At" DOUBLE PRECISION,
+            "Full_Pages" INTEGER,
+            "Fetched_Rows" INTEGER NOT NULL,
+            "Changed_Rows" INTEGER NOT NULL,
+            "Churn_Rate" DOUBLE PRECISION NOT NULL,
+            "Resume_After" TEXT,
+            "Resume_Started_At" DOUBLE PRECISION,
+            "Resume_Pages" INTEGER
+        )
+    '''))
+    existing = {column['name'] for column in inspect(conn).get_columns(REFRESH_STATE_TABLE)}
+    for name, sql_type in RESUME_COLUMNS.items():
+        if name not in existing:
+            conn.execute(text(f'ALTER TABLE {REFRESH_STATE_TABLE} ADD COLUMN "{name}" {sql_type}'))
+
+
+def load_state(conn):
+    ensure_state_table(conn)
+    rows = conn.execute(text(f'SELECT {quote_columns(STATE_COLUMNS)} FROM {REFRESH_STATE_TABLE}'))
+    return {row.Topic: row._asdict() for row in rows}
+
+
+def save_state(conn, entries):
+    if not entries:
+        return
+    ensure_state_table(conn)
+    columns = quote_columns(STATE_COLUMNS)
+    values = ", ".join(f':{name}' for name in STATE_COLUMNS)
+    updates = ", ".join(f'"{name}" = excluded."{name}"' for name in STATE_COLUMNS[1:])
+    conn.execute(text(f'''
+        INSERT INTO {REFRESH_STATE_TABLE} ({columns}) VALUES ({values})
+        ON CONFLICT ("Topic") DO UPDATE SET {updates}
+    '''), entries)
+
+
+# Expected changes waiting in a topic: its churn rate (changes per hour) times the hours since
+# its last fetch, plus a staleness term that reaches 1 after STALE_AFTER_HOURS.
+# Topics never fetched to the end come first.
+def priority(entry, now):
+    if entry is None or entry['Watermark'] is None:
+        return math.inf
+    hours = max(now - entry['Last_Fetched_At'], 0.0) / 3600
+    return entry['Churn_Rate'] * hours + hours / STALE_AFTER_HOURS
+
+
+# Hours since the topic was last fetched; breaks priority ties, so topics never fetched to the end
+# take turns instead of the same ones winning every run
+def waiting_hours(entry, now):
+    return math.inf if entry is None else (now - entry['Last_Fetched_At']) / 3600
+
+
+# Split the page budget across the due topics (priority >= 1), hottest first.
+# A periodic full refetch is reserved the pages its last full fetch took, plus one for growth;
+# when the budget cannot cover it the topic is refreshed incrementally this time. The remaining
+# budget is shared in proportion to priority, with at least one page per incremental topic and
+# RANGE_PAGES per full fetch, enough to finish a created: range and move its resume cursor; when it
+# cannot cover that, the lowest priorities wait for a later run. A topic never fetched to the end
+# weighs as much as all the others together.
+# Returns [{'topic', 'priority', 'pages', 'since', 'resume'}]; since is None for a full refetch, and
+# resume is the date a cut-short full fetch continues after (None to start from the oldest repositories).
+def plan_refresh(topics, state, now, budget=REQUEST_BUDGET):
+    ranked = sorted(((priority(state.get(topic), now), waiting_hours(state.get(topic), now), topic) for topic in topics),
+                    reverse=True)
+    plan = [{'topic': topic, 'priority': weight, 'pages': 0, 'since': refresh_since(state.get(topic), now),
+             'resume': resume_after(state.get(topic))}
+            for weight, _, topic in ranked if weight >= 1]
+
+    remaining = budget
+    for entry in plan:
+        previous = state.get(entry['topic'])
+        if entry['since'] is not None:
+            entry['resume'] = None
+        elif entry['resume'] is None and previous and previous['Full_Pages']:
+            if previous['Full_Pages'] + 1 <= remaining:
+                entry['pages'] = previous['Full_Pages'] + 1
+                remaining -= entry['pages']
+            else:
+                entry['since'] = watermark_date(previous)
+
+    shared = [entry for entry in plan if not entry['pages']]
+    finite = sum(entry['priority'] for entry in shared if entry['priority'] != math.inf) or 1.0
+    weights = [finite if entry['priority'] == math.inf else entry['priority'] for entry in shared]
+    total, share = sum(weights), remaining
+    for entry, weight in zip(shared, weights):
+        least = RANGE_PAGES if entry['since'] is None else 1
+        if remaining < least:
+            continue
+        entry['pages'] = max(least, min(remaining, int(share * weight / total)))
+        remaining -= entry['pages']
+    return [entry for entry in plan if entry['pages']]
+
+
+def watermark_date(entry):
+    return datetime.fromtimestamp(entry['Watermark'], timezone.utc).date()
+
+
+# Date for the pushed:>= qualifier, or None when the topic is due a full refetch
+def refresh_since(entry, now):
+    if entry is None or entry['Watermark'] is None or entry['Last_Full_At'] is None:
+        return None
+    if entry['Resume_After'] is not None or now - entry['Last_Full_At'] >= FULL_REFRESH_DAYS * 86400:
+        return None
+    return watermark_date(entry)
+
+
+# Creation date a cut-short full fetch continues after, or None
+def resume_after(entry):
+    if entry is None or entry['Resume_After'] is None:
+        return None
+    return date.fromisoformat(entry['Resume_After'])
+
+
+# New state for a fetched topic. The watermark only moves when the fetch ran to the end, so
+# repositories beyond a budget-truncated page are requested again next time. A full fetch cut short
+# keeps the last creation date it walked in full as its resume cursor; once a resumed fetch reaches
+# the end, the watermark is the time the first of its runs started, since the ranges walked in
+# earlier runs are only known to be current as of then.
+def next_state(topic, entry, planned, fetched, now):
+    previous = entry or {}
+    complete = fetched['complete']
+    walk = planned['since'] is None
+    resumed = walk and planned['resume'] is not None
+    started = previous['Resume_Started_At'] if resumed else now
+    pages = fetched['fetched_pages'] + (previous['Resume_Pages'] if resumed else 0)
+    cursor = fetched.get('created_through') if walk and not complete else None
+    hours = (now - entry['Last_Fetched_At']) / 3600 if entry else None
+    rate = fetched['changed'] / max(hours, 1 / 60) if hours is not None else 0.0
+    if entry:
+        rate = CHURN_SMOOTHING * rate + (1 - CHURN_SMOOTHING) * entry['Churn_Rate']
+
+    return {
+        'Topic': topic,
+        'Last_Fetched_At': now,
+        'Watermark': started if complete else previous.get('Watermark'),
+        'Last_Full_At': started if walk and complete else previous.get('Last_Full_At'),
+        'Full_Pages': pages if walk and complete else previous.get('Full_Pages'),
+        'Fetched_Rows': fetched['rows'],
+        'Changed_Rows': fetched['changed'],
+        'Churn_Rate': rate,
+        'Resume_After': cursor.isoformat() if cursor else None,
+        'Resume_Started_At': started if cursor else None,
+        'Resume_Pages': pages if cursor else None
+    }
+
+
+# Plan, fetch, store and record one refresh run. Topics that fail keep their old state and are retried next run.
+def run_refresh(topics, budget=REQUEST_BUDGET, clock=time.time, scheduler=None, url=api_url, workers=4, batch_rows=1000,
+                clean_workers=CLEAN_WORKERS, pool=None):
+    now = clock()
+    with get_engine().begin() as conn:
+        state = load_state(conn)
+    plan = plan_refresh(topics, state, now, budget)
+
+    stats = run_pipeline([entry['topic'] for entry in plan], fetch_workers=workers, clean_workers=clean_workers,
+                         max_pages={entry['topic']: entry['pages'] for entry in plan},
+                         since={entry['topic']: entry['since'] for entry in plan},
+                         created_after={entry['topic']: entry['resume'] for entry in plan},
+                         scheduler=scheduler, url=url, batch_rows=batch_rows, pool=pool)
+    fetched = {entry['topic']: stats['topics'].get(entry['topic'], {'rows': 0, 'changed': 0, 'fetched_pages': 0, 'complete': False,
+                                                                   'created_through': entry['resume']})
+               for entry in plan}
+
+    entries = [next_state(entry['topic'], state.get(entry['topic']), entry, fetched[entry['topic']], now)
+               for entry in plan if entry['topic'] not in stats['errors']]
+    with get_engine().begin() as conn:
+        save_state(conn, entries)
+
+    stats['plan'] = [{**entry, **fetched[entry['topic']]} for entry in plan]
+    stats['deferred'] = len(topics) - len(plan)
+    return stats
@@ -0,0 +1,155 @@
+import os
+
+from sqlalchemy import BigInteger, Date, Integer, String, column, table
+
+
+# Table names, column types and index definitions shared by the writer (store) and the readers (queries)
+
+# Table written by store_data and the key that identifies one repository within a topic.
+# The ingest app writes repositories_df; the explorer is pointed at the published table with TABLE_NAME.
+TABLE_NAME = os.getenv('TABLE_NAME', 'repositories_df')
+KEY_COLUMNS = ['Owner', 'Repository_Name', 'Topic']
+
+# Storage layout. 'flat' keeps one wide row per repository per topic in TABLE_NAME. 'normalized' stores
+# each repository once, keyed by its GitHub id, with topic membership and the language and license
+# names in tables of their own; TABLE_NAME is then a view with the flat table's columns, so every
+# reader works unchanged. A normalized layout needs a TABLE_NAME not already used by a flat table.
+STORAGE_LAYOUT = os.getenv('STORAGE_LAYOUT', 'flat')
+NORMALIZED = STORAGE_LAYOUT == 'normalized'
+
+REPOS_TABLE = f'{TABLE_NAME}_repos'
+TOPICS_TABLE = f'{TABLE_NAME}_topics'
+LANGUAGES_TABLE = f'{TABLE_NAME}_languages'
+LICENSES_TABLE = f'{TABLE_NAME}_licenses'
+
+# A repository row is only rewritten when one of these changed since the last fetch
+CHANGE_COLUMNS = ['Last_Updated_Date', 'Number_of_Stars', 'Number_of_Forks', 'Number_of_Open_Issues']
+
+# Parquet snapshot of the table, partitioned by Topic, refreshed after every write
+SNAPSHOT_DIR = os.getenv('SNAPSHOT_DIR', 'snapshot')
+
+# Sibling directories of a Topic= partition that older exports swapped through; never topics
+SNAPSHOT_STAGING_SUFFIXES = ('.tmp', '.old')
+
+
+def quote_columns(columns):
+    return ", ".join(f'"{column}"' for column in columns)
+
+
+# Column types are fixed rather than inferred, so a narrow int or datetime64 in the
+# first batch never becomes a SMALLINT or TIMESTAMP column
+SQL_TYPES = {
+    'Creation_Date': Date(),
+    'Last_Updated_Date': Date(),
+    'Number_of_Stars': Integer(),
+    'Number_of_Forks': Integer(),
+    'Number_of_Open_Issues': Integer(),
+    'Repository_Id': BigInteger()
+}
+
+
+# Lightweight description of the repositories table used to build filtered queries
+repositories = table(
+    TABLE_NAME,
+    column('Topic', String),
+    column('Repository_Name', String),
+    column('Owner', String),
+    column('Description', String),
+    column('URL', String),
+    column('Programming_Language', String),
+    column('Creation_Date', Date),
+    column('Last_Updated_Date', Date),
+    column('Number_of_Stars', Integer),
+    column('Number_of_Forks', Integer),
+    column('Number_of_Open_Issues', Integer),
+    column('License_Type', String),
+    column('Repository_Id', BigInteger)
+)
+
+
+# Rollup of repository counts per topic x language x license x creation year/month,
+# maintained at ingest so the Topic_Visuals pies and trend lines read a few hundred rows
+ROLLUP_TABLE = f'{TABLE_NAME}_rollup'
+ROLLUP_COLUMNS = ['Topic', 'Programming_Language', 'License_Type', 'Creation_Year', 'Creation_Month', 'Repository_Count']
+
+rollups = table(
+    ROLLUP_TABLE,
+    column('Topic', String),
+    column('Programming_Language', String),
+    column('License_Type', String),
+    column('Creation_Year', Integer),
+    column('Creation_Month', Integer),
+    column('Repository_Count', Integer)
+)
+
+
+# Cross-topic leaderboards, maintained incrementally at ingest by the leaderboards module.
+# A repository fetched under several topics counts once in each of them.
+OWNER_STATS_TABLE = f'{TABLE_NAME}_owner_stats'
+LANGUAGE_YEARS_TABLE = f'{TABLE_NAME}_language_years'
+LICENSE_MIX_TABLE = f'{TABLE_NAME}_license_mix'
+
+owner_stats = table(
+    OWNER_STATS_TABLE,
+    column('Owner', String),
+    column('Repository_Count', Integer),
+    column('Total_Stars', Integer),
+    column('Total_Forks', Integer)
+)
+
+language_years = table(
+    LANGUAGE_YEARS_TABLE,
+    column('Programming_Language', String),
+    column('Creation_Year', Integer),
+    column('Repository_Count', Integer)
+)
+
+license_mix = table(
+    LICENSE_MIX_TABLE,
+    column('Programming_Language', String),
+    column('License_Type', String),
+    column('Repository_Count', Integer)
+)
+
+
+# Metric history: one row per repository per day on which its counts changed.
+# Repositories are keyed by a small integer id instead of repeating owner/name strings.
+HISTORY_TABLE = 'repository_history'
+REPOSITORY_IDS_TABLE = 'repository_ids'
+
+
+# Per-topic refresh bookkeeping kept by the refresh scheduler
+REFRESH_STATE_TABLE = f'{TABLE_NAME}_refresh_state'
+
+
+# Full-text document over name, owner and description; the GIN index is built on this exact expression
+SEARCH_DOCUMENT = """to_tsvector('simple', coalesce("Repository_Name", '') || ' ' || coalesce("Owner", '') || ' ' || coalesce("Description", ''))"""
+
+
+# Indexes backing the filtered explorer queries. In the normalized layout they go on the base
+# tables behind the view: topic lookups use the membership key, the rest index the repos table.
+def topic_index_statements():
+    if NORMALIZED:
+        return [
+            f'CREATE INDEX IF NOT EXISTS {REPOS_TABLE}_language ON {REPOS_TABLE} ("Language_Id")',
+            f'CREATE INDEX IF NOT EXISTS {REPOS_TABLE}_created ON {REPOS_TABLE} ("Creation_Date")',
+            f'CREATE INDEX IF NOT EXISTS {REPOS_TABLE}_updated ON {REPOS_TABLE} ("Last_Updated_Date")',
+            f'CREATE INDEX IF NOT EXISTS {REPOS_TABLE}_stars ON {REPOS_TABLE} ("Number_of_Stars" DESC)',
+            f'CREATE INDEX IF NOT EXISTS {REPOS_TABLE}_name ON {REPOS_TABLE} ("Owner", "Repository_Name")'
+        ]
+    return [
+        f'CREATE INDEX IF NOT EXISTS {TABLE_NAME}_topic_language ON {TABLE_NAME} ("Topic", "Programming_Language")',
+        f'CREATE INDEX IF NOT EXISTS {TABLE_NAME}_topic_created ON {TABLE_NAME} ("Topic", "Creation_Date")',
+        f'CREATE INDEX IF NOT EXISTS {TABLE_NAME}_topic_updated ON {TABLE_NAME} ("Topic", "Last_Updated_Date")',
+        f'CREATE INDEX IF NOT EXISTS {TABLE_NAME}_topic_stars ON {TABLE_NAME} ("Topic", "Number_of_Stars" DESC)'
+    ]
+
+
+# Full-text GIN index plus a trigram index on names for typo-tolerant matches
+def search_index_statements():
+    indexed = REPOS_TABLE if NORMALIZED else TABLE_NAME
+    return [
+        'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+        f'CREATE INDEX IF NOT EXISTS {indexed}_search ON {indexed} USING GIN ({SEARCH_DOCUMENT})',
+        f'CREATE INDEX IF NOT EXISTS {indexed}_name_trgm ON {indexed} USING GIN ("Repository_Name" gin_trgm_ops)'
+    ]
@@ -0,0 +1,75 @@
+import heapq
+import re
+from collections import Counter, defaultdict
+
+
+# In-process search index used when the explorer runs without PostgreSQL (snapshot mode).
+# Mirrors the database search: full-text matches over name, owner and description,
+# plus trigram similarity on repository names for typo tolerance.
+
+# Names sharing less than this fraction of trigrams with the query are not typo matches
+SIMILARITY_THRESHOLD = 0.3
+
+
+def tokenize(text):
+    return re.findall(r'[a-z0-9]+', str(text).lower())
+
+
+# Trigrams of each word padded the way pg_trgm does: two spaces before, one after
+def trigrams(text):
+    grams = set()
+    for word in tokenize(text):
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class SearchIndex:
+    def __init__(self, df):
+        self.df = df.reset_index(drop=True)
+        self.tokens = defaultdict(set)
+        self.trigrams = defaultdict(set)
+        self.name_trigram_counts = []
+
+        columns = zip(self.df['Repository_Name'], self.df['Owner'], self.df['Description'])
+        for row, (name, owner, description) in enumerate(columns):
+            for token in tokenize(f'{name} {owner} {description}'):
+                self.tokens[token].add(row)
+
+            name_grams = trigrams(name)
+            for gram in name_grams:
+                self.trigrams[gram].add(row)
+            self.name_trigram_counts.append(len(name_grams))
+
+    # Score = full-text match (every query term present, as websearch_to_tsquery ANDs them)
+    # + trigram similarity of the name, like ts_rank + similarity()
+    def scores(self, query):
+        scores = Counter()
+        postings = sorted((self.tokens.get(term, set()) for term in set(tokenize(query))), key=len)
+        if postings:
+            for row in postings[0].intersection(*postings[1:]):
+                scores[row] += 1.0
+
+        query_grams = trigrams(query)
+        shared = Counter()
+        for gram in query_grams:
+            for row in self.trigrams.get(gram, ()):
+                shared[row] += 1
+        for row, count in shared.items():
+            similarity = count / (len(query_grams) + self.name_trigram_counts[row] - count)
+            if similarity >= SIMILARITY_THRESHOLD:
+                scores[row] += similarity
+
+        return scores
+
+    # Ranked hits as repository rows with a Rank column, paginated by limit/offset
+    def search(self, query, limit=20, offset=0):
+        ranked = heapq.nsmallest(offset + limit, self.scores(query).items(), key=lambda item: (-item[1], item[0]))
+        ranked = ranked[offset:]
+
+        hits = self.df.iloc[[row for row, _ in ranked]].copy()
+        hits['Rank'] = [score for _, score in ranked]
+        hits = hits.reset_index(drop=True)
+        hits.index = hits.index + 1
+        hits.index.name = 'ID'
+        return hits
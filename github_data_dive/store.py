@@ -0,0 +1,341 @@
+import io
+import os
+import shutil
+import threading
+from datetime import date, timedelta
+from urllib.parse import quote
+
+import pandas as pd
+from sqlalchemy import delete, extract, func, insert, inspect, select, text
+from sqlalchemy.exc import SQLAlchemyError
+
+from github_data_dive.clean import COUNT_COLUMNS, DATE_COLUMNS
+from github_data_dive.database import get_engine
+from github_data_dive.instrumentation import span
+from github_data_dive.leaderboards import ensure_leaderboard_tables, finish_delta, rebuild_leaderboards, start_delta
+from github_data_dive.normalized import clear_normalized, ensure_normalized_tables, merge_normalized
+from github_data_dive.schema import (CHANGE_COLUMNS, HISTORY_TABLE, KEY_COLUMNS, NORMALIZED, REPOSITORY_IDS_TABLE,
+                                     ROLLUP_COLUMNS, ROLLUP_TABLE, SNAPSHOT_DIR, SNAPSHOT_STAGING_SUFFIXES, SQL_TYPES,
+                                     TABLE_NAME, quote_columns, repositories, rollups, search_index_statements,
+                                     topic_index_statements)
+
+
+# Writing cleaned batches: upsert, rollups, leaderboards, metric history and the Parquet snapshot
+
+# Called with no arguments after every finalized write; the dashboard registers its cache clear here
+write_listeners = []
+
+
+def on_write(callback):
+    write_listeners.append(callback)
+
+
+def notify_write():
+    for callback in write_listeners:
+        callback()
+
+
+# Create the table (or the normalized tables and their view) and its indexes; see prepare_storage.
+# Flat tables created before repositories carried their GitHub id gain the column here.
+def ensure_table(conn, df):
+    if NORMALIZED:
+        ensure_normalized_tables(conn)
+    else:
+        if not inspect(conn).has_table(TABLE_NAME):
+            df.head(0).to_sql(TABLE_NAME, con=conn, index=False, dtype=SQL_TYPES)
+        elif 'Repository_Id' not in {column['name'] for column in inspect(conn).get_columns(TABLE_NAME)}:
+            conn.execute(text(f'ALTER TABLE {TABLE_NAME} ADD COLUMN "Repository_Id" BIGINT'))
+        conn.execute(text(f'CREATE UNIQUE INDEX IF NOT EXISTS {TABLE_NAME}_key ON {TABLE_NAME} ({quote_columns(KEY_COLUMNS)})'))
+
+    for statement in topic_index_statements():
+        conn.execute(text(statement))
+
+    # The name index needs pg_trgm; without the privilege to create it, search ranks on the full-text index alone
+    if conn.dialect.name == 'postgresql':
+        for statement in search_index_statements():
+            try:
+                with conn.begin_nested():
+                    conn.execute(text(statement))
+            except SQLAlchemyError:
+                pass
+
+
+def ensure_rollup_table(conn):
+    conn.execute(text(f'''
+        CREATE TABLE IF NOT EXISTS {ROLLUP_TABLE} (
+            "Topic" TEXT, "Programming_Language" TEXT, "License_Type" TEXT,
+            "Creation_Year" INTEGER, "Creation_Month" INTEGER, "Repository_Count" INTEGER
+        )
+    '''))
+    conn.execute(text(f'CREATE INDEX IF NOT EXISTS {ROLLUP_TABLE}_topic ON {ROLLUP_TABLE} ("Topic", "Programming_Language", "Creation_Year")'))
+
+
+# Tables, indexes and extensions are created once per process and database, in a short transaction
+# of their own. CREATE INDEX locks its table even when the index already exists; run inside every
+# write's transaction, concurrent writers would queue behind, and deadlock with, each other's merges.
+# New leaderboard tables are backfilled here too.
+prepared = set()
+prepare_lock = threading.Lock()
+
+
+def prepare_storage(df):
+    engine = get_engine()
+    with prepare_lock:
+        if engine.url in prepared:
+            return
+        with engine.begin() as conn:
+            ensure_table(conn, df)
+            ensure_rollup_table(conn)
+            if ensure_leaderboard_tables(conn):
+                rebuild_leaderboards(conn)
+        prepared.add(engine.url)
+
+
+# Bulk-load the batch into a staging table shaped like TABLE_NAME: COPY on PostgreSQL, executemany elsewhere
+def load_staging(conn, df, staging):
+    if conn.dialect.name == 'postgresql':
+        conn.execute(text(f'CREATE TEMP TABLE {staging} (LIKE {TABLE_NAME} INCLUDING DEFAULTS) ON COMMIT DROP'))
+        buffer = io.StringIO()
+        df.to_csv(buffer, index=False, header=False)
+        buffer.seek(0)
+        cursor = conn.connection.cursor()
+        cursor.copy_expert(f'COPY {staging} ({quote_columns(df.columns)}) FROM STDIN WITH (FORMAT csv)', buffer)
+    else:
+        df.to_sql(staging, con=conn, if_exists='replace', index=False, dtype=SQL_TYPES)
+
+
+# Recompute the rollup rows of the topics touched by a write, inside the same transaction
+def refresh_rollups(conn, topics):
+    c = repositories.c
+    creation_year = extract('year', c.Creation_Date)
+    creation_month = extract('month', c.Creation_Date)
+    aggregate = (select(c.Topic, c.Programming_Language, c.License_Type, creation_year, creation_month, func.count())
+                 .where(c.Topic.in_(topics))
+                 .group_by(c.Topic, c.Programming_Language, c.License_Type, creation_year, creation_month))
+
+    conn.execute(delete(rollups).where(rollups.c.Topic.in_(topics)))
+    conn.execute(insert(rollups).from_select(ROLLUP_COLUMNS, aggregate))
+
+
+# On PostgreSQL the history is range-partitioned by month so old months stay cold
+def ensure_history_tables(conn, observed_on):
+    postgres = conn.dialect.name == 'postgresql'
+    conn.execute(text(f'''
+        CREATE TABLE IF NOT EXISTS {REPOSITORY_IDS_TABLE} (
+            "Repo_ID" {'SERIAL' if postgres else 'INTEGER'} PRIMARY KEY,
+            "Owner" TEXT NOT NULL, "Repository_Name" TEXT NOT NULL,
+            UNIQUE ("Owner", "Repository_Name")
+        )
+    '''))
+    conn.execute(text(f'''
+        CREATE TABLE IF NOT EXISTS {HISTORY_TABLE} (
+            "Repo_ID" INTEGER NOT NULL, "Observed_On" DATE NOT NULL,
+            "Number_of_Stars" INTEGER, "Number_of_Forks" INTEGER, "Number_of_Open_Issues" INTEGER,
+            PRIMARY KEY ("Repo_ID", "Observed_On")
+        ) {'PARTITION BY RANGE ("Observed_On")' if postgres else ''}
+    '''))
+
+    if postgres:
+        month = observed_on.replace(day=1)
+        next_month = (month + timedelta(days=32)).replace(day=1)
+        conn.execute(text(f'''
+            CREATE TABLE IF NOT EXISTS {HISTORY_TABLE}_{month:%Y_%m} PARTITION OF {HISTORY_TABLE}
+            FOR VALUES FROM ('{month.isoformat()}') TO ('{next_month.isoformat()}')
+        '''))
+
+
+# Append today's observation for every repository in source whose counts differ from its latest one
+def record_history(conn, source):
+    observed_on = date.today()
+    ensure_history_tables(conn, observed_on)
+
+    conn.execute(text(f'''
+        INSERT INTO {REPOSITORY_IDS_TABLE} ("Owner", "Repository_Name")
+        SELECT DISTINCT "Owner", "Repository_Name" FROM {source} WHERE true
+        ON CONFLICT ("Owner", "Repository_Name") DO NOTHING
+    '''))
+
+    # A repository fetched under several topics is observed once
+    conn.execute(text(f'''
+        INSERT INTO {HISTORY_TABLE} ("Repo_ID", "Observed_On", "Number_of_Stars", "Number_of_Forks", "Number_of_Open_Issues")
+        SELECT i."Repo_ID", :observed_on, s."Number_of_Stars", s."Number_of_Forks", s."Number_of_Open_Issues"
+        FROM (
+            SELECT "Owner", "Repository_Name", MAX("Number_of_Stars") AS "Number_of_Stars",
+                   MAX("Number_of_Forks") AS "Number_of_Forks", MAX("Number_of_Open_Issues") AS "Number_of_Open_Issues"
+            FROM {source} GROUP BY "Owner", "Repository_Name"
+        ) s
+        JOIN {REPOSITORY_IDS_TABLE} i ON i."Owner" = s."Owner" AND i."Repository_Name" = s."Repository_Name"
+        LEFT JOIN {HISTORY_TABLE} h ON h."Repo_ID" = i."Repo_ID"
+            AND h."Observed_On" = (SELECT MAX("Observed_On") FROM {HISTORY_TABLE} WHERE "Repo_ID" = i."Repo_ID")
+        WHERE h."Repo_ID" IS NULL
+            OR h."Number_of_Stars" IS DISTINCT FROM s."Number_of_Stars"
+            OR h."Number_of_Forks" IS DISTINCT FROM s."Number_of_Forks"
+            OR h."Number_of_Open_Issues" IS DISTINCT FROM s."Number_of_Open_Issues"
+        ON CONFLICT ("Repo_ID", "Observed_On") DO UPDATE SET
+            "Number_of_Stars" = excluded."Number_of_Stars",
+            "Number_of_Forks" = excluded."Number_of_Forks",
+            "Number_of_Open_Issues" = excluded."Number_of_Open_Issues"
+    '''), {'observed_on': observed_on})
+
+
+# Merge the staged batch into the table; rows whose CHANGE_COLUMNS are unchanged are left alone.
+# The normalized layout stages one row per repository beside it and merges both into its tables.
+# WHERE true disambiguates INSERT ... SELECT ... ON CONFLICT for SQLite
+def merge_staging(conn, df, staging):
+    if NORMALIZED:
+        repos_staging = f'{TABLE_NAME}_repos_staging'
+        load_staging(conn, df.drop_duplicates(subset='Repository_Id', keep='last'), repos_staging)
+        merge_normalized(conn, staging, repos_staging)
+        if conn.dialect.name != 'postgresql':
+            conn.execute(text(f'DROP TABLE {repos_staging}'))
+        return
+
+    columns = quote_columns(df.columns)
+    excluded_changed = " OR ".join(f'{TABLE_NAME}."{column}" IS DISTINCT FROM excluded."{column}"' for column in CHANGE_COLUMNS)
+    updates = ", ".join(f'"{column}" = excluded."{column}"' for column in df.columns if column not in KEY_COLUMNS)
+    # Rows stored before the GitHub id was fetched pick it up on their next fetch
+    conn.execute(text(f'''
+        INSERT INTO {TABLE_NAME} ({columns})
+        SELECT {columns} FROM {staging} WHERE true
+        ON CONFLICT ({quote_columns(KEY_COLUMNS)}) DO UPDATE SET {updates}
+        WHERE {excluded_changed} OR {TABLE_NAME}."Repository_Id" IS NULL
+    '''))
+
+
+# Merge a cleaned batch into the table in one transaction, keyed on (Owner, Repository_Name, Topic).
+# Returns how many rows were inserted, updated and left unchanged.
+# With refresh=False the rollup is left for finalize_topics, for callers writing many batches.
+def upsert_data(df, refresh=True):
+    df = df.drop_duplicates(subset=KEY_COLUMNS, keep='last')
+    staging = f'{TABLE_NAME}_staging'
+    join = " AND ".join(f's."{column}" = t."{column}"' for column in KEY_COLUMNS)
+    changed = " OR ".join(f's."{column}" IS DISTINCT FROM t."{column}"' for column in CHANGE_COLUMNS)
+
+    prepare_storage(df)
+    with get_engine().begin() as conn:
+        with span('to_sql', rows=len(df)):
+            load_staging(conn, df, staging)
+
+        inserted, updated = conn.execute(text(f'''
+            SELECT COALESCE(SUM(CASE WHEN t."Owner" IS NULL THEN 1 ELSE 0 END), 0),
+                   COALESCE(SUM(CASE WHEN t."Owner" IS NOT NULL AND ({changed}) THEN 1 ELSE 0 END), 0)
+            FROM {staging} s LEFT JOIN {TABLE_NAME} t ON {join}
+        ''')).one()
+
+        with span('leaderboards'):
+            start_delta(conn, staging)
+
+        with span('merge', rows=len(df)):
+            merge_staging(conn, df, staging)
+
+        with span('leaderboards'):
+            finish_delta(conn, staging)
+
+        with span('history'):
+            record_history(conn, staging)
+
+        if conn.dialect.name != 'postgresql':
+            conn.execute(text(f'DROP TABLE {staging}'))
+
+        if refresh:
+            refresh_rollups(conn, df['Topic'].unique().tolist())
+
+    return {'inserted': int(inserted), 'updated': int(updated), 'unchanged': len(df) - int(inserted) - int(updated)}
+
+
+# Replace the whole table with the batch. The flat table is dropped and recreated, so its indexes
+# are recreated too; the normalized layout keeps its tables and dictionaries and re-merges the batch
+# into emptied repos and membership tables.
+def replace_data(conn, df):
+    if not NORMALIZED:
+        df.to_sql(TABLE_NAME, con=conn, if_exists='replace', index=False, dtype=SQL_TYPES)
+        ensure_table(conn, df)
+        return
+
+    staging = f'{TABLE_NAME}_staging'
+    clear_normalized(conn)
+    load_staging(conn, df.drop_duplicates(subset=KEY_COLUMNS, keep='last'), staging)
+    merge_staging(conn, df, staging)
+    if conn.dialect.name != 'postgresql':
+        conn.execute(text(f'DROP TABLE {staging}'))
+
+
+# One Arrow schema for every partition. Schemas inferred per partition differ (int8 stars in one
+# topic, int16 in the next, float ids where some are missing) and a read across them fails;
+# read_snapshot downcasts after reading instead.
+def snapshot_schema():
+    import pyarrow as pa
+
+    types = {column: pa.int64() for column in COUNT_COLUMNS + ['Repository_Id']}
+    types.update({column: pa.timestamp('ns') for column in DATE_COLUMNS})
+    return pa.schema([(name, types.get(name, pa.string())) for name in repositories.c.keys() if name != 'Topic'])
+
+
+# Rewrite the Parquet snapshot partitions of the topics touched by a write.
+# A partition's directory stays in place and only its file is swapped: the new file is written under
+# a dot-prefixed name, which Parquet readers skip, then renamed over the old one. The rename is atomic,
+# so a reader sees either the old or the new rows of a topic, never a partial file or no partition.
+def export_snapshot(topics):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    query = select(repositories).where(repositories.c.Topic.in_(topics))
+    df = pd.read_sql(query, get_engine(), parse_dates=DATE_COLUMNS)
+    schema = snapshot_schema()
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+
+    for topic, part in df.groupby('Topic'):
+        partition = os.path.join(SNAPSHOT_DIR, f'Topic={quote(topic, safe="")}')
+        os.makedirs(partition, exist_ok=True)
+        staging = os.path.join(partition, '.part-0.parquet.tmp')
+        table = pa.Table.from_pandas(part.drop(columns='Topic'), schema=schema, preserve_index=False)
+        pq.write_table(table, staging)
+        os.replace(staging, os.path.join(partition, 'part-0.parquet'))
+
+        # Directories left by the directory swap earlier exports used
+        for suffix in SNAPSHOT_STAGING_SUFFIXES:
+            shutil.rmtree(f'{partition}{suffix}', ignore_errors=True)
+
+
+# Remove the snapshot partitions of every topic not in topics
+def prune_snapshot(topics):
+    if not os.path.isdir(SNAPSHOT_DIR):
+        return
+    keep = {f'Topic={quote(topic, safe="")}' for topic in topics}
+    for name in os.listdir(SNAPSHOT_DIR):
+        if name.startswith('Topic=') and name not in keep:
+            shutil.rmtree(os.path.join(SNAPSHOT_DIR, name), ignore_errors=True)
+
+
+# Refresh everything derived from the given topics: rollups, snapshot partitions and write listeners
+def finalize_topics(topics):
+    with get_engine().begin() as conn:
+        refresh_rollups(conn, topics)
+    export_snapshot(topics)
+    notify_write()
+
+
+# Save the DataFrame to the PostgreSQL database.
+# 'upsert' merges the batch into the existing table, 'replace' overwrites the table and drops the
+# rollup rows and snapshot partitions of topics no longer in it.
+# Write listeners are notified afterwards so a running explorer shows the new data.
+# Batch writers pass finalize=False per page and call finalize_topics once per topic.
+def store_data(df, mode='upsert', finalize=True):
+    if mode == 'replace':
+        prepare_storage(df)
+        with get_engine().begin() as conn:
+            with span('to_sql', rows=len(df)):
+                replace_data(conn, df)
+            record_history(conn, TABLE_NAME)
+            rebuild_leaderboards(conn)
+            conn.execute(delete(rollups))
+            refresh_rollups(conn, df['Topic'].unique().tolist())
+        prune_snapshot(df['Topic'].unique().tolist())
+        counts = {'inserted': len(df), 'updated': 0, 'unchanged': 0}
+    else:
+        counts = upsert_data(df, refresh=finalize)
+
+    if finalize:
+        export_snapshot(df['Topic'].unique().tolist())
+        notify_write()
+    return counts
@@ -0,0 +1,426 @@
+import functools
+import os
+
+import pandas as pd
+import streamlit as st
+
+from github_data_dive import queries, store
+from github_data_dive.instrumentation import finish_rerun, recording, span, stage_breakdown, start_rerun, write_metrics
+from github_data_dive.queries import MAX_CHART_ROWS, SEARCH_PAGE_SIZE, repository_counts, top_repositories
+
+
+# Streamlit shell shared by the ingest app and the explorer: cached wrappers around the core
+# queries plus the widgets and charts. plotly is imported inside the functions that draw a
+# chart, so a rerun that draws none never pays for it.
+
+# Cached query results expire after CACHE_TTL seconds; each cached function keeps at most
+# CACHE_MAX_ENTRIES results, evicting the least recently used
+CACHE_TTL = int(os.getenv('CACHE_TTL', '600'))
+CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', '128'))
+
+# Rows sent to the browser per table page
+TABLE_PAGE_SIZE = int(os.getenv('TABLE_PAGE_SIZE', '100'))
+
+# Cross-topic views offered in the sidebar
+LEADERBOARDS = ['None', 'Top owners by stars', 'Language share by creation year', 'License mix by language']
+
+# Folder where the topic images are stored
+IMAGE_FOLDER = 'Images'
+
+# Dictionary to map topics to descriptions
+TOPIC_DESCRIPTIONS = {
+    "machine learning": "Machine learning is the study of computer algorithms that improve automatically through experience. It enables systems to learn from data patterns and make predictions or decisions without explicit programming. Applications range from recommendation systems to image recognition.",
+
+    "data visualization": "Data visualization is the graphical representation of information and data, allowing complex data sets to be communicated clearly and efficiently. By using visual elements like charts and maps, it helps users understand trends, outliers, and patterns in data. Effective visualizations enhance decision-making and storytelling.",
+
+    "deep learning": "Deep learning is a subset of machine learning involving neural networks with three or more layers, which simulate the way the human brain operates. It excels in processing unstructured data such as images, sound, and text, driving advancements in fields like natural language processing and computer vision.",
+
+    "natural language processing": "Natural Language Processing (NLP) is the branch of AI that enables computers to understand, interpret, and generate human language. It encompasses a range of tasks, from sentiment analysis and language translation to chatbots and voice recognition. NLP aims to bridge the gap between human communication and computer understanding.",
+
+    "data engineering": "Data engineering focuses on the practical application of data collection, storage, and transformation processes to prepare data for analytical and operational purposes. It involves building data pipelines, designing database systems, and ensuring data quality and integrity, enabling data scientists and analysts to access reliable data for analysis.",
+
+    "data science": "Data science is an interdisciplinary field that uses scientific methods, processes, algorithms, and systems to extract knowledge and insights from structured and unstructured data. It combines expertise from statistics, computer science, and domain knowledge, playing a critical role in decision-making across various industries.",
+
+    "python": "Python is a versatile and powerful programming language widely used in various domains, particularly in data science, web development, and automation. Known for its readability and simplicity, Python boasts a rich ecosystem of libraries and frameworks, such as Pandas and NumPy, making it a favorite among data professionals.",
+
+    "sql": "SQL (Structured Query Language) is a domain-specific language used in programming and managing relational databases. It enables users to create, read, update, and delete data efficiently, allowing for complex queries and data manipulation. SQL is essential for data analysis and database management.",
+
+    "cloud computing": "Cloud computing refers to the delivery of computing services over the internet, including storage, processing, and networking. It allows organizations to access and manage their data and applications remotely, providing scalability, flexibility, and cost-effectiveness. Cloud services can be categorized into public, private, and hybrid clouds.",
+
+    "big data": "Big data refers to extremely large datasets that may be analyzed computationally to reveal patterns, trends, and associations. These datasets can be structured, semi-structured, or unstructured, requiring specialized tools and techniques for processing. Big data analytics helps organizations gain insights that drive strategic decision-making."
+}
+
+
+# Hit/miss counters shared by every session of this server process
+@st.cache_resource
+def get_cache_stats():
+    return {'calls': 0, 'misses': 0}
+
+
+# Called from inside a cached function body, which only runs on a cache miss
+def record_miss():
+    get_cache_stats()['misses'] += 1
+
+
+# Count every call so hits can be derived as calls - misses
+def counted(func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        get_cache_stats()['calls'] += 1
+        with span(func.__name__) as fields:
+            result = func(*args, **kwargs)
+            if isinstance(result, pd.DataFrame):
+                fields['rows'] = len(result)
+            return result
+    return wrapper
+
+
+def cache_counters():
+    stats = get_cache_stats()
+    return {'hits': stats['calls'] - stats['misses'], 'misses': stats['misses']}
+
+
+# Cache a core query per server process; the body only runs, and records a miss, on a cache miss
+def cached(func):
+    @functools.wraps(func)
+    def miss(*args, **kwargs):
+        record_miss()
+        return func(*args, **kwargs)
+    return counted(st.cache_data(ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES)(miss))
+
+
+has_table = cached(queries.has_table)
+load_data = cached(queries.load_data)
+load_topics = cached(queries.load_topics)
+load_filter_options = cached(queries.load_filter_options)
+load_star_range = cached(queries.load_star_range)
+query_repositories = cached(queries.query_repositories)
+load_rollup = cached(queries.load_rollup)
+load_topic_page = cached(queries.load_topic_page)
+search_repositories = cached(queries.search_repositories)
+load_history = cached(queries.load_history)
+load_fastest_rising = cached(queries.load_fastest_rising)
+load_owner_leaderboard = cached(queries.load_owner_leaderboard)
+load_language_trend = cached(queries.load_language_trend)
+load_license_mix = cached(queries.load_license_mix)
+
+# Drop cached query results after every write so the explorer shows the new data
+store.on_write(st.cache_data.clear)
+
+
+# Fallback index for snapshot mode, built once per topic and kept for CACHE_TTL
+@st.cache_resource(ttl=CACHE_TTL)
+def get_search_index(topic):
+    return queries.build_search_index(topic)
+
+
+# Query and show one page of the table, numbered across the whole selection; only that page is
+# fetched and serialized to the browser.
+# Payload sizes are measured only for the performance panel: serializing every figure again costs a render.
+def paginated_table(selection, count, payload):
+    pages = -(-count // TABLE_PAGE_SIZE)
+    page = st.number_input(f"Table page (of {pages})", min_value=1, max_value=pages, step=1) if pages > 1 else 1
+    offset = (page - 1) * TABLE_PAGE_SIZE
+    table_page = query_repositories(limit=TABLE_PAGE_SIZE, offset=offset, **selection)
+    table_page.index = table_page.index + offset
+
+    st.dataframe(table_page)
+    if recording():
+        payload.append(int(table_page.memory_usage(deep=True).sum()))
+    return table_page
+
+
+# Build and draw one chart under a single span, so the plotly figure construction is timed along
+# with plotly_chart. build(title) returns the figure.
+def show_chart(title, build, payload):
+    with span(f'chart: {title}'):
+        fig = build(title)
+        st.plotly_chart(fig)
+    if recording():
+        payload.append(len(fig.to_json()))
+
+
+# Function to display image and description for the selected topic
+def img_desc(selected_topic):
+    image_path = os.path.join(IMAGE_FOLDER, f'{selected_topic.lower()}.jpg')
+    if os.path.exists(image_path):
+        st.image(image_path, caption=selected_topic.title(), use_column_width=True)
+    else:
+        st.write(f"Image for {selected_topic.title()} not found.")
+
+    # Display description
+    description = TOPIC_DESCRIPTIONS.get(selected_topic.lower(), "No description available for this topic.")
+    st.write(description)
+
+
+# Sidebar filters; the topic comes from a selectbox unless the caller already chose one
+def filters(topics, selected_topic=None):
+    # Filter by topic
+    if not selected_topic:
+        selected_topic = st.sidebar.selectbox("Select Topic", topics)
+
+    # Display image and description for the selected topic
+    img_desc(selected_topic)
+
+    # Filter programming languages dynamically based on the selected topic
+    options = load_filter_options(selected_topic)
+    languages = ['Default'] + options['languages']
+
+    selected_language = st.sidebar.selectbox("Select Programming Language", languages)
+
+    # Filter by creation and last updated date
+    creation_dates = ['Default'] + options['creation_years']
+    selected_creation_date = st.sidebar.selectbox("Select Creation Year", creation_dates)
+
+    last_updated_dates = ['Default'] + options['updated_years']
+    selected_last_updated_date = st.sidebar.selectbox("Select Last Updated Year", last_updated_dates)
+
+    # Apply filters in the database
+    selection = {
+        'topic': selected_topic,
+        'language': selected_language,
+        'creation_year': selected_creation_date,
+        'updated_year': selected_last_updated_date
+    }
+
+    # Activity level filter
+    min_stars, max_stars, repository_count = load_star_range(**selection)
+    if repository_count:
+        if min_stars != max_stars:
+            activity_level = st.sidebar.slider("Select Minimum Number of Stars", min_stars, max_stars, min_stars, int((min_stars + max_stars) / 10))
+        else:
+            st.sidebar.write("Only one unique star count available. Using that value for filtering.")
+            activity_level = min_stars
+        # A threshold at the minimum keeps every row, so it is not sent as a filter
+        if activity_level > min_stars:
+            selection['min_stars'] = activity_level
+    else:
+        st.sidebar.write("No data available to filter.")
+
+    return selected_topic, selected_creation_date, selection
+
+
+# Returns the table page it fetched
+def Topic_Visuals(selected_topic, selected_creation_date, selection, topic_page):
+    import plotly.express as px
+
+    count, totals, top, charted, rollup = (topic_page[key] for key in ['count', 'totals', 'top', 'charted', 'rollup'])
+
+    # Approximate bytes sent to the browser by this render, measured while the performance panel is on
+    payload = []
+
+    st.markdown(f"<h2 style='text-align: LEFT;'>Filtered Repositories under Topic: {selected_topic.upper()}</h2>", unsafe_allow_html=True)
+    st.markdown(f"<h3 style='text-align: LEFT;'>Total Repositories Found: {count}</h3>", unsafe_allow_html=True)
+
+    table_page = None
+    if count:
+        table_page = paginated_table(selection, count, payload)
+    else:
+        st.write("No repositories found with the selected filters.")
+
+    # Visualizations
+    st.subheader("Visual Insights over Repository")
+    downsampled = count > MAX_CHART_ROWS
+    if downsampled:
+        st.caption(f"Bar charts show the top {MAX_CHART_ROWS} of {count} repositories.")
+
+    # Pie chart: Distribution of repositories by programming language
+    lang_data = repository_counts(charted, rollup, 'Programming_Language')
+    show_chart('Repositories by Programming Language', lambda title: px.pie(lang_data, names='Programming_Language', values='Repository_Count', title=title), payload)
+
+    # Line chart: Number of repositories created per year
+    if rollup is None:
+        charted['Creation_Year'] = charted['Creation_Date'].dt.year
+    if selected_creation_date == 'Default':
+        year_data = repository_counts(charted, rollup, 'Creation_Year')
+        show_chart('Repository Creation Trend (Yearly)', lambda title: px.line(year_data, x='Creation_Year', y='Repository_Count', title=title), payload)
+    else:
+        if rollup is not None:
+            month_data = repository_counts(charted, rollup, 'Creation_Month').rename(columns={'Creation_Month': 'Creation_Date'})
+        else:
+            month_data = charted[charted['Creation_Year'] == int(selected_creation_date)].groupby(charted['Creation_Date'].dt.month).size().reset_index(name='Repository_Count')
+        show_chart(f'Repository Creation Trend for {selected_creation_date} (Monthly)', lambda title: px.line(month_data, x='Creation_Date', y='Repository_Count', title=title), payload)
+
+    # Bar charts, from the top repositories per metric queried with ORDER BY/LIMIT
+    show_chart('Number of Stars per Repository',
+               lambda title: px.bar(top_repositories(top['Number_of_Stars'], 'Number_of_Stars', count, totals['Number_of_Stars']), x='Repository_Name', y='Number_of_Stars', title=title, text='Number_of_Stars').update_traces(textposition='outside', marker_color='blue'),
+               payload)
+
+    # Histogram: star distribution over every filtered repository
+    if downsampled:
+        show_chart('Distribution of Stars', lambda title: px.histogram(charted, x='Number_of_Stars', nbins=50, log_y=True, title=title), payload)
+
+    show_chart('Number of Forks per Repository', lambda title: px.bar(top_repositories(top['Number_of_Forks'], 'Number_of_Forks', count, totals['Number_of_Forks']), x='Repository_Name', y='Number_of_Forks', title=title), payload)
+    show_chart('Number of Open Issues per Repository', lambda title: px.bar(top_repositories(top['Number_of_Open_Issues'], 'Number_of_Open_Issues', count, totals['Number_of_Open_Issues']), x='Repository_Name', y='Number_of_Open_Issues', title=title), payload)
+
+    # Pie chart: Distribution of repositories by license type
+    license_data = repository_counts(charted, rollup, 'License_Type')
+    show_chart('Repositories by License Type', lambda title: px.pie(license_data, names='License_Type', values='Repository_Count', title=title), payload)
+
+    # Bar chart: Comparison of stars and forks
+    comparison_data = top['Number_of_Stars'][['Repository_Name', 'Number_of_Stars', 'Number_of_Forks']].melt(id_vars='Repository_Name', value_vars=['Number_of_Stars', 'Number_of_Forks'], var_name='Metric', value_name='Count')
+    show_chart('Comparison of Stars and Forks per Repository', lambda title: px.bar(comparison_data, x='Repository_Name', y='Count', color='Metric', barmode='group', title=title), payload)
+
+    # Table: repositories gaining the most stars recently
+    rising = topic_page['rising']
+    if selected_topic:
+        if rising is None:
+            rising = load_fastest_rising(selected_topic)
+        if not rising.empty:
+            st.subheader("Fastest Rising Repositories (Last 30 Days)")
+            st.dataframe(rising)
+
+    if payload:
+        st.caption(f"Payload this render: {sum(payload) / 1024:.1f} KiB across {len(payload)} tables and charts")
+    return table_page
+
+
+# Cross-topic leaderboards, drawn from the precomputed aggregate tables
+def leaderboard_visuals(view):
+    import plotly.express as px
+
+    payload = []
+    st.markdown(f"<h2 style='text-align: LEFT;'>Leaderboard: {view}</h2>", unsafe_allow_html=True)
+
+    if view == 'Top owners by stars':
+        owners = load_owner_leaderboard()
+        if owners.empty:
+            st.write("No leaderboard data available yet.")
+            return
+        st.dataframe(owners)
+        show_chart('Total Stars per Owner Across Topics', lambda title: px.bar(owners, x='Owner', y='Total_Stars', title=title), payload)
+
+    elif view == 'Language share by creation year':
+        trend = load_language_trend()
+        if trend.empty:
+            st.write("No leaderboard data available yet.")
+            return
+        show_chart('Language Share of New Repositories per Year', lambda title: px.area(trend, x='Creation_Year', y='Share', color='Programming_Language', title=title), payload)
+
+    elif view == 'License mix by language':
+        mix = load_license_mix()
+        if mix.empty:
+            st.write("No leaderboard data available yet.")
+            return
+        show_chart('License Mix by Programming Language', lambda title: px.bar(mix, x='Programming_Language', y='Share', color='License_Type', title=title), payload)
+
+
+def repository_card(selected_repo):
+    st.markdown(f"""
+            <div style='background-color: #f4f4f4; padding: 20px; border-radius: 10px;'>
+                <h2 style='color: #2E86C1; text-align: center;'>{selected_repo['Repository_Name']}</h2>
+                <p style='text-align: center; font-size: 16px; color: #566573;'>⭐ {selected_repo['Number_of_Stars']} | 🍴 {selected_repo['Number_of_Forks']} | 🐛 {selected_repo['Number_of_Open_Issues']}</p>
+                <p style='text-align: center; font-size: 14px; color: #7D3C98;'>Owner: {selected_repo['Owner']}</p>
+                <p style='text-align: center; font-size: 14px; color: #7D3C98;'>Description: {selected_repo['Description']}</p>
+                <p style='text-align: center; font-size: 14px; color: #7D3C98;'>Language: {selected_repo['Programming_Language']}</p>
+                <p style='text-align: center; font-size: 14px; color: #7D3C98;'>Created On: {selected_repo['Creation_Date'].strftime('%B %d, %Y')}</p>
+                <p style='text-align: center; font-size: 14px; color: #7D3C98;'>Last Updated: {selected_repo['Last_Updated_Date'].strftime('%B %d, %Y')}</p>
+                <p style='text-align: center; font-size: 14px; color: #7D3C98;'>License: {selected_repo['License_Type']}</p>
+                <p style='text-align: center; font-size: 14px; color: #7D3C98;'><a href="{selected_repo['URL']}" style="color: #E74C3C;">View Repository</a></p>
+            </div>
+        """, unsafe_allow_html=True)
+
+    # Line chart: star and fork growth from the recorded history
+    history = load_history(selected_repo['Owner'], selected_repo['Repository_Name'])
+    if len(history) > 1:
+        import plotly.express as px
+
+        growth_data = history.melt(id_vars='Observed_On', value_vars=['Number_of_Stars', 'Number_of_Forks'], var_name='Metric', value_name='Count')
+        fig = px.line(growth_data, x='Observed_On', y='Count', color='Metric', line_shape='hv', title='Growth Over Time')
+        st.plotly_chart(fig)
+
+
+# The card's repository is queried on its own, by its position in the selection's table order
+def repo_visuals(selection, count):
+    st.markdown("<h2 style='text-align: center;'>Selected  Repository </h2>", unsafe_allow_html=True)
+    if count:
+        repo_index = st.sidebar.number_input("Select Repository ID", min_value=1, max_value=count, step=1)
+        repository_card(query_repositories(limit=1, offset=repo_index - 1, **selection).iloc[0])
+
+
+# Search hits within the selected topic, feeding the repository card directly
+def search_visuals(search_text, selected_topic):
+    st.markdown("<h2 style='text-align: center;'>Search Results</h2>", unsafe_allow_html=True)
+    page = st.sidebar.number_input("Search Results Page", min_value=1, step=1)
+    offset = (page - 1) * SEARCH_PAGE_SIZE
+    if queries.DATA_SOURCE == 'snapshot':
+        hits = get_search_index(selected_topic).search(search_text, SEARCH_PAGE_SIZE, offset)
+    else:
+        hits = search_repositories(search_text, selected_topic, SEARCH_PAGE_SIZE, offset)
+
+    if hits.empty:
+        st.write("No repositories match the search.")
+        return
+
+    st.dataframe(hits[['Repository_Name', 'Owner', 'Description', 'Number_of_Stars', 'Rank']])
+    hit = st.sidebar.selectbox("Select Search Result", hits.index, format_func=lambda i: f"{hits.loc[i, 'Owner']}/{hits.loc[i, 'Repository_Name']}")
+    repository_card(hits.loc[hit])
+
+
+# Sidebar breakdown of where the current rerun spent its time
+# Spans are recorded per thread, so a fetch shows its pipeline stages, which ran on the fetch
+# threads and clean processes, from run_pipeline's stats instead
+def performance_panel(filtered_data, pipeline_stats=None):
+    spans, seconds, profile_path = finish_rerun()
+    with st.sidebar.expander("Performance", expanded=True):
+        st.caption(f"Rerun: {seconds * 1000:.0f} ms across {len(spans)} spans")
+        st.dataframe(pd.DataFrame(stage_breakdown(spans)))
+        if pipeline_stats is not None:
+            st.caption(f"Fetch pipeline: {pipeline_stats['seconds'] * 1000:.0f} ms")
+            st.dataframe(pd.DataFrame(pipeline_stats['stages']).T)
+        if filtered_data is not None:
+            st.caption(f"Table page: {len(filtered_data)} rows, {filtered_data.memory_usage(deep=True).sum() / 1024 ** 2:.2f} MiB")
+        if profile_path:
+            st.caption(f"cProfile written to {profile_path}")
+
+
+# Optional per-rerun timing panel; profiling dumps a cProfile file for this rerun
+def performance_toggle():
+    show_performance = st.sidebar.checkbox("Show performance panel")
+    if show_performance:
+        start_rerun(profile=st.sidebar.checkbox("Profile this rerun"))
+    return show_performance
+
+
+# Filters, topic visuals and the repository card or search hits for the selected topic.
+# Returns the table page shown, or None when the database or the selection has no data.
+def explorer(topics, selected_topic=None):
+    if not topics:
+        st.warning("No data available in the database.")
+        return None
+
+    # Apply filters
+    with span('filters'):
+        selected_topic, selected_creation_date, selection = filters(topics, selected_topic)
+    topic_page = load_topic_page(**selection)
+
+    # Topic Visuals
+    with span('Topic_Visuals', rows=topic_page['count']):
+        filtered_data = Topic_Visuals(selected_topic, selected_creation_date, selection, topic_page)
+
+    # Cross-topic leaderboards
+    view = st.sidebar.selectbox("Leaderboard", LEADERBOARDS)
+    if view != 'None':
+        with span('leaderboards'):
+            leaderboard_visuals(view)
+
+    # Display the search hits or the selected repository information
+    search_text = st.sidebar.text_input("Search Repositories")
+    if search_text:
+        search_visuals(search_text, selected_topic)
+    else:
+        repo_visuals(selection, topic_page['count'])
+
+    return filtered_data
+
+
+# Cache counters, then the performance panel or the metrics export for this rerun.
+# pipeline_stats is run_pipeline's result when this rerun fetched a topic.
+def footer(show_performance, filtered_data, pipeline_stats=None):
+    counters = cache_counters()
+    st.sidebar.caption(f"Cache hits: {counters['hits']} | misses: {counters['misses']}")
+
+    if show_performance:
+        performance_panel(filtered_data, pipeline_stats)
+    else:
+        write_metrics()
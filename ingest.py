@@ -0,0 +1,108 @@
+import argparse
+import json
+import os
+
+from github_data_dive.pipeline import CLEAN_WORKERS, run_pipeline
+from github_data_dive.refresh import REQUEST_BUDGET, run_refresh
+
+
+# Headless batch ingestion: fetch, clean and store a list of topics outside the Streamlit UI.
+# Usage: python -m ingest topics.txt --workers 8 --checkpoint ingest_checkpoint.json
+#        python -m ingest topics.txt --refresh --budget 300   (incremental refresh of the stalest, busiest topics)
+
+
+def read_topics(path):
+    with open(path) as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith('#')]
+
+
+# Topics finished by an earlier, interrupted run are skipped on resume
+def load_checkpoint(path):
+    if not os.path.exists(path):
+        return set()
+    with open(path) as f:
+        return set(json.load(f)['completed'])
+
+
+# Write to a temporary file and swap it in so an interruption never leaves a truncated checkpoint
+def save_checkpoint(path, completed):
+    with open(f'{path}.tmp', 'w') as f:
+        json.dump({'completed': sorted(completed)}, f)
+    os.replace(f'{path}.tmp', path)
+
+
+def run(topics, workers=8, max_pages=None, checkpoint='ingest_checkpoint.json', batch_rows=1000,
+        clean_workers=CLEAN_WORKERS):
+    completed = load_checkpoint(checkpoint)
+    pending = [topic for topic in topics if topic not in completed]
+
+    def on_done(topic):
+        completed.add(topic)
+        save_checkpoint(checkpoint, completed)
+
+    stats = run_pipeline(pending, fetch_workers=workers, clean_workers=clean_workers, max_pages=max_pages,
+                         batch_rows=batch_rows, on_done=on_done)
+    stats['skipped'] = len(topics) - len(pending)
+
+    # A finished run starts from scratch next time
+    if not stats['errors'] and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    return stats
+
+
+def print_summary(stats):
+    print(f"Topics skipped from checkpoint: {stats['skipped']}")
+    print(f"Pages: {stats['pages']} | repositories: {stats['repositories']} | wall time: {stats['seconds']:.2f}s")
+    print(f"Throughput: {stats['pages_per_sec']:.2f} pages/s | {stats['repos_per_sec']:.1f} repos/s")
+    print("Stages (busy time summed across workers):")
+    for stage, stage_stats in stats['stages'].items():
+        print(f"  {stage:<8}{stage_stats['seconds']:>9.2f}s | {stage_stats['rows_per_sec']:>9.0f} rows/s"
+              f" | {stage_stats['utilization']:>4.0%} busy")
+    print("Queues:")
+    for name, queue_stats in stats['queues'].items():
+        print(f"  {name:<8}depth mean {queue_stats['mean_depth']:.1f} / max {queue_stats['max_depth']} of {queue_stats['capacity']}"
+              f" | producers blocked {queue_stats['blocked_seconds']:.2f}s")
+    print(f"Rows inserted: {stats['inserted']} | updated: {stats['updated']} | unchanged: {stats['unchanged']}")
+    print(f"API requests: {stats['requests']} | saved by 304: {stats['requests_saved']} | throttled: {stats['throttled_seconds']:.1f}s")
+    for topic, error in stats['errors'].items():
+        print(f"FAILED {topic}: {error}")
+
+
+def print_refresh_summary(stats):
+    print(f"Topics refreshed: {len(stats['plan'])} | deferred: {stats['deferred']}")
+    for entry in stats['plan']:
+        since = entry['since'].isoformat() if entry['since'] else 'full'
+        print(f"  {entry['topic']:<30}priority {entry['priority']:>8.2f} | pages {entry['fetched_pages']:>4}/{entry['pages']:<4}"
+              f" | since {since:<10} | rows {entry['rows']:>6} | changed {entry['changed']:>6}")
+    print(f"API requests: {stats['requests']} | saved by 304: {stats['requests_saved']} | throttled: {stats['throttled_seconds']:.1f}s")
+    for topic, error in stats['errors'].items():
+        print(f"FAILED {topic}: {error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fetch, clean and store GitHub repositories for a list of topics.")
+    parser.add_argument('topics_file', help="text file with one topic per line")
+    parser.add_argument('--workers', type=int, default=8, help="topics fetched in parallel")
+    parser.add_argument('--clean-workers', type=int, default=CLEAN_WORKERS, help="processes cleaning batches")
+    parser.add_argument('--max-pages', type=int, default=None, help="page limit per topic")
+    parser.add_argument('--checkpoint', default='ingest_checkpoint.json', help="progress file used to resume")
+    parser.add_argument('--batch-rows', type=int, default=1000, help="rows cleaned and stored per batch; bounds memory per worker")
+    parser.add_argument('--refresh', action='store_true', help="fetch only what changed since each topic's last refresh")
+    parser.add_argument('--budget', type=int, default=REQUEST_BUDGET, help="result pages a refresh run may fetch across all topics")
+    args = parser.parse_args()
+
+    if args.refresh:
+        stats = run_refresh(read_topics(args.topics_file), args.budget, workers=args.workers, batch_rows=args.batch_rows,
+                            clean_workers=args.clean_workers)
+        print_refresh_summary(stats)
+    else:
+        stats = run(read_topics(args.topics_file), args.workers, args.max_pages, args.checkpoint, args.batch_rows,
+                    args.clean_workers)
+        print_summary(stats)
+
+    if stats['errors']:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+import argparse
+import json
+import os
+import random
+import statistics
+import threading
+import time
+
+
+# Load test for the explorer's database path: N concurrent sessions each replay the queries
+# one uncached render issues (topic list, sidebar options, star range, then the topic page)
+# and the render latency is reported as p50/p99. The queries are the explorer's own, from
+# github_data_dive.queries, against READ_DATABASE_URL and schema.TABLE_NAME.
+# Usage: python loadtest.py --sessions 50 --renders 20 [--async]
+# Pool settings come from the DB_* environment variables read by database.py.
+
+# Rows per table page, as the explorer's TABLE_PAGE_SIZE
+TABLE_PAGE_SIZE = int(os.getenv('TABLE_PAGE_SIZE', '100'))
+
+
+def session(queries, topics, renders, seed, latencies, errors, lock):
+    rng = random.Random(seed)
+    for _ in range(renders):
+        started = time.perf_counter()
+        failed = None
+        try:
+            queries.load_topics()
+            topic = rng.choice(topics)
+            queries.load_filter_options(topic)
+            queries.load_star_range(topic=topic)
+            queries.load_topic_page(topic=topic)
+            # The first table page, which the explorer queries apart from the topic page
+            queries.query_repositories(limit=TABLE_PAGE_SIZE, topic=topic)
+        except Exception as error:
+            failed = error
+        elapsed = time.perf_counter() - started
+
+        with lock:
+            if failed is None:
+                latencies.append(elapsed)
+            else:
+                errors[type(failed).__name__] = errors.get(type(failed).__name__, 0) + 1
+
+
+# The core modules are imported here, after --async has set DB_ASYNC
+def run(sessions, renders):
+    from github_data_dive import queries
+    from github_data_dive.database import ASYNC_QUERIES
+    from github_data_dive.schema import TABLE_NAME
+
+    topics = queries.load_topics()
+    if not topics:
+        raise SystemExit(f"{TABLE_NAME} is empty; ingest some topics first.")
+
+    latencies, errors, lock = [], {}, threading.Lock()
+    threads = [
+        threading.Thread(target=session, args=(queries, topics, renders, seed, latencies, errors, lock))
+        for seed in range(sessions)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'sessions': sessions,
+        'renders': len(latencies),
+        'async': ASYNC_QUERIES,
+        'p50_ms': statistics.median(latencies) * 1000 if latencies else None,
+        'p99_ms': latencies[max(int(len(latencies) * 0.99) - 1, 0)] * 1000 if latencies else None,
+        'renders_per_sec': len(latencies) / seconds,
+        'errors': errors,
+        'pool': queries.read_engine().pool.status()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate concurrent explorer sessions against the database.")
+    parser.add_argument('--sessions', type=int, nargs='+', default=[1, 10, 50])
+    parser.add_argument('--renders', type=int, default=20, help="renders per session")
+    parser.add_argument('--async', dest='use_async', action='store_true', help="run independent queries through asyncpg")
+    args = parser.parse_args()
+    if args.use_async:
+        os.environ['DB_ASYNC'] = '1'
+
+    for sessions in args.sessions:
+        print(json.dumps(run(sessions, args.renders)))
+
+
+if __name__ == '__main__':
+    main()
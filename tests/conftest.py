@@ -0,0 +1,51 @@
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+# Tests run against a throwaway SQLite database and snapshot directory; set TEST_DATABASE_URL to run
+# them against PostgreSQL instead. The package reads these at import, so they are set before it loads.
+WORKDIR = tempfile.mkdtemp(prefix='github-data-dive-tests-')
+os.environ.update(DATABASE_URL=os.getenv('TEST_DATABASE_URL') or f'sqlite:///{os.path.join(WORKDIR, "tests.db")}',
+                  SNAPSHOT_DIR=os.path.join(WORKDIR, 'snapshot'), STORAGE_LAYOUT='flat')
+os.environ.pop('READ_DATABASE_URL', None)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+# Drop every table, view and snapshot written so far
+def reset_store():
+    from sqlalchemy import MetaData, inspect
+
+    from github_data_dive import schema, store
+    from github_data_dive.database import get_engine
+
+    with get_engine().begin() as conn:
+        for view in inspect(conn).get_view_names():
+            conn.exec_driver_sql(f'DROP VIEW {view}')
+    metadata = MetaData()
+    metadata.reflect(get_engine())
+    metadata.drop_all(get_engine())
+    store.prepared.clear()
+    shutil.rmtree(schema.SNAPSHOT_DIR, ignore_errors=True)
+
+
+# Starts the test on an empty store; the test can call the yielded function to empty it again
+@pytest.fixture
+def empty_store():
+    reset_store()
+    yield reset_store
+
+
+# One clean worker process shared by every test that runs the staged pipeline
+@pytest.fixture(scope='session')
+def clean_pool():
+    from github_data_dive import pipeline
+
+    with pipeline.clean_pool(1) as pool:
+        yield pool
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(WORKDIR, ignore_errors=True)
@@ -0,0 +1,23 @@
+import threading
+
+import benchmark
+from github_data_dive import fetch
+
+TOPICS = [f'topic{number}' for number in range(5)]
+
+
+# Once stop is set, neither the topic being fetched nor those still queued make another request
+def test_stop_ends_queued_topics():
+    items = [{**item, 'topic': topic} for offset, topic in enumerate(TOPICS)
+             for item in benchmark.synthetic_items(150, 0, offset * 150)]
+    server, url = benchmark.start_mock_api(items)
+    stop = threading.Event()
+    scheduler = fetch.RequestScheduler(tokens=[]).with_stop(stop)
+    try:
+        stats = fetch.harvest_topics(TOPICS, lambda topic, df: stop.set(), max_workers=1, scheduler=scheduler, url=url)
+    finally:
+        server.shutdown()
+
+    assert stats['requests'] == 1
+    assert stats['pages'] == 1
+    assert set(stats['errors']) == set(TOPICS)
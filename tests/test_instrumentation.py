@@ -0,0 +1,18 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from github_data_dive.instrumentation import recording, span
+
+
+# With recording off, fields written by concurrent spans stay with their own span
+def test_disabled_spans_do_not_share_fields():
+    assert not recording()
+
+    def write(rows):
+        with span('query') as fields:
+            assert fields == {}
+            fields['rows'] = rows
+            return fields
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        written = list(pool.map(write, range(100)))
+    assert [fields['rows'] for fields in written] == list(range(100))
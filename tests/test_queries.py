@@ -0,0 +1,26 @@
+import pandas as pd
+
+import benchmark
+from github_data_dive import clean, fetch, queries, store
+
+
+def store_topic(rows, topic='web'):
+    items = list(benchmark.synthetic_items(rows))
+    df = pd.DataFrame([fetch.repository_record(item, topic) for item in items], columns=fetch.REPOSITORY_COLUMNS)
+    store.store_data(clean.clean_repository_data(df))
+
+
+# Most synthetic repositories share a star count, so pages only line up with a unique tiebreaker
+def test_pages_cover_every_row_once(empty_store, monkeypatch):
+    store_topic(250)
+    columns = ['Owner', 'Repository_Name', 'Number_of_Stars']
+    for source in ['database', 'snapshot']:
+        monkeypatch.setattr(queries, 'DATA_SOURCE', source)
+        pages = [queries.query_repositories(columns, limit=40, offset=offset, topic='web') for offset in range(0, 250, 40)]
+        paged = pd.concat(pages, ignore_index=True)
+        assert len(paged.drop_duplicates(['Owner', 'Repository_Name'])) == 250
+        assert paged['Number_of_Stars'].is_monotonic_decreasing
+        if source == 'database':
+            expected = paged
+        else:
+            assert paged.astype(str).equals(expected.astype(str))
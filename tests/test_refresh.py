@@ -0,0 +1,71 @@
+from datetime import datetime, timezone
+
+import pandas as pd
+from sqlalchemy import func, select
+
+import benchmark
+from github_data_dive import fetch, refresh, schema
+from github_data_dive.database import get_engine
+
+# More topics than the budget can fetch in full, each bigger than the search result cap, so every
+# first fetch is split into created: ranges and cut short by its share of the budget
+TOPIC_ROWS = 1500
+TOPICS = [f'topic{number}' for number in range(5)]
+BUDGET = 30
+
+
+def stored_rows():
+    r = schema.repositories.c
+    stored = pd.read_sql(select(r.Topic, func.count().label('rows')).group_by(r.Topic), get_engine())
+    return dict(zip(stored['Topic'], stored['rows']))
+
+
+def test_cut_short_full_fetches_resume(empty_store, clean_pool):
+    items = [{**item, 'topic': topic} for offset, topic in enumerate(TOPICS)
+             for item in benchmark.synthetic_items(TOPIC_ROWS, 0, offset * TOPIC_ROWS)]
+    server, url = benchmark.start_mock_api(items)
+    now = datetime(2025, 1, 1, tzinfo=timezone.utc).timestamp()
+    resumed = set()
+    try:
+        for _ in range(8):
+            stats = refresh.run_refresh(TOPICS, BUDGET, clock=lambda: now, url=url, scheduler=fetch.RequestScheduler(tokens=[]),
+                                        batch_rows=fetch.PER_PAGE, pool=clean_pool)
+            assert not stats['errors']
+            assert all(entry['pages'] >= refresh.RANGE_PAGES for entry in stats['plan'] if entry['since'] is None)
+            resumed.update(entry['topic'] for entry in stats['plan'] if entry['resume'] is not None)
+
+            with get_engine().begin() as conn:
+                state = refresh.load_state(conn)
+            if all(topic in state and state[topic]['Watermark'] is not None for topic in TOPICS):
+                break
+            now += 6 * 3600
+    finally:
+        server.shutdown()
+
+    # Every topic finished its first full fetch, most by continuing from a saved cursor
+    assert all(state[topic]['Watermark'] is not None and state[topic]['Resume_After'] is None for topic in TOPICS)
+    assert resumed
+    assert stored_rows() == {topic: TOPIC_ROWS for topic in TOPICS}
+    # The watermark is when the first run of a resumed fetch started, so nothing pushed since is skipped
+    assert all(state[topic]['Watermark'] <= state[topic]['Last_Fetched_At'] for topic in TOPICS)
+    assert all(state[topic]['Full_Pages'] >= -(-TOPIC_ROWS // fetch.PER_PAGE) for topic in TOPICS)
+
+
+def test_plan_gives_new_topics_turns():
+    now = datetime(2025, 1, 1, tzinfo=timezone.utc).timestamp()
+    topics = [f'topic{number}' for number in range(50)]
+    state = {}
+    planned = set()
+    for _ in range(3):
+        plan = refresh.plan_refresh(topics, state, now, budget=300)
+        assert all(entry['pages'] >= refresh.RANGE_PAGES and entry['since'] is None for entry in plan)
+        planned.update(entry['topic'] for entry in plan)
+        for entry in plan:
+            fetched = {'rows': 0, 'changed': 0, 'fetched_pages': entry['pages'], 'complete': False,
+                       'created_through': datetime(2015, 1, 1).date()}
+            state[entry['topic']] = refresh.next_state(entry['topic'], state.get(entry['topic']), entry, fetched, now)
+        now += 3600
+
+    # Topics the budget could not cover wait a run, then go before the ones already fetched
+    assert planned == set(topics)
+    assert all(state[topic]['Resume_After'] == '2015-01-01' for topic in topics)
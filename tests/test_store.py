@@ -0,0 +1,32 @@
+import os
+import shutil
+import threading
+
+from github_data_dive import queries, schema, store
+from test_queries import store_topic
+
+
+# Readers racing a re-export always find the topic with all its rows; staging leftovers are not topics
+def test_snapshot_swap_has_no_gap(empty_store):
+    store_topic(200)
+    partition = os.path.join(schema.SNAPSHOT_DIR, 'Topic=web')
+    shutil.copytree(partition, f'{partition}.old')
+    shutil.copy(os.path.join(partition, 'part-0.parquet'), os.path.join(partition, '.part-0.parquet.tmp'))
+    assert queries.snapshot_topics() == ['web']
+
+    done = threading.Event()
+
+    def export():
+        for _ in range(20):
+            store.export_snapshot(['web'])
+        done.set()
+
+    thread = threading.Thread(target=export)
+    thread.start()
+    reads = 0
+    while not done.is_set() or not reads:
+        assert queries.snapshot_topics() == ['web']
+        assert len(queries.read_snapshot('web', ['Repository_Name'])) == 200
+        reads += 1
+    thread.join()
+    assert not os.path.exists(f'{partition}.old')
@@ -0,0 +1,150 @@
+import os
+import random
+import subprocess
+import sys
+
+import pandas as pd
+from sqlalchemy import select
+
+import benchmark
+from github_data_dive import clean, fetch, leaderboards, pipeline, schema, store
+from github_data_dive import queries as reads
+from github_data_dive.database import get_engine
+
+# The correctness checks of the benchmark suite, on a few hundred rows so they run on every change
+TOPICS = ['machine-learning', 'web', 'cli']
+LEADERBOARD_TABLES = [schema.owner_stats, schema.language_years, schema.license_mix]
+
+
+def repository_batch(rows, topic, start=0, seed=0):
+    items = benchmark.synthetic_items(rows, seed, start)
+    return clean.clean_repository_data(pd.DataFrame([fetch.repository_record(item, topic) for item in items],
+                                                    columns=fetch.REPOSITORY_COLUMNS))
+
+
+def counts(frame):
+    return {key if isinstance(key, str) else int(key): int(count) for key, count in zip(frame.iloc[:, 0], frame['Repository_Count'])}
+
+
+def assert_rollup_matches():
+    for topic in reads.load_topics():
+        options = reads.load_filter_options(topic)
+        for language in ['Default'] + options['languages']:
+            for creation_year in ['Default'] + options['creation_years'][::4]:
+                selection = {'topic': topic, 'language': language, 'creation_year': creation_year}
+                filtered_data = reads.query_repositories(**selection)
+                filtered_data['Creation_Year'] = filtered_data['Creation_Date'].dt.year
+                filtered_data['Creation_Month'] = filtered_data['Creation_Date'].dt.month
+                rollup = reads.load_rollup(**selection)
+                assert rollup is not None
+                dimensions = ['Programming_Language', 'License_Type', 'Creation_Year']
+                if creation_year != 'Default':
+                    dimensions.append('Creation_Month')
+                for by in dimensions:
+                    assert counts(reads.repository_counts(filtered_data, rollup, by)) == \
+                        counts(reads.repository_counts(filtered_data, None, by)), (selection, by)
+
+
+# Every chart count served from the rollup equals the count over the selected rows, also after a replace
+def test_rollup_matches_rows(empty_store):
+    for number, topic in enumerate(TOPICS):
+        store.store_data(repository_batch(200, topic, number * 200))
+    assert_rollup_matches()
+
+    store.store_data(repository_batch(100, TOPICS[0], 1000), mode='replace')
+    assert_rollup_matches()
+    assert reads.load_topics() == [TOPICS[0]]
+    assert all(reads.load_rollup(topic=topic).empty for topic in TOPICS[1:])
+
+
+def read_tables(tables):
+    frames = [pd.read_sql(select(table), get_engine()) for table in tables]
+    return [df.sort_values(list(df.columns)).reset_index(drop=True) for df in frames]
+
+
+def read_leaderboards():
+    return [df.astype({name: 'int64' for name in df.columns[1:] if name != 'License_Type'}) for df in read_tables(LEADERBOARD_TABLES)]
+
+
+# Leaderboards maintained batch by batch, through re-ingested stars, languages and second topics,
+# equal a full recomputation
+def test_incremental_leaderboards_match_rebuild(empty_store):
+    rng = random.Random(0)
+    samples = []
+    for number, topic in enumerate(TOPICS):
+        batch = repository_batch(150, topic, number * 150)
+        store.store_data(batch, finalize=False)
+        samples.append(batch.sample(frac=0.3, random_state=number))
+
+    churn = pd.concat(samples, ignore_index=True).astype({'Topic': str, 'Programming_Language': str})
+    churn['Number_of_Stars'] = churn['Number_of_Stars'] + [rng.randrange(50) for _ in range(len(churn))]
+    churn.loc[[rng.random() < 0.3 for _ in range(len(churn))], 'Programming_Language'] = 'rust'
+    second_topic = [rng.random() < 0.3 for _ in range(len(churn))]
+    churn.loc[second_topic, 'Topic'] = [rng.choice(TOPICS) for _ in range(sum(second_topic))]
+    store.store_data(churn, finalize=False)
+
+    incremental = read_leaderboards()
+    with get_engine().begin() as conn:
+        leaderboards.rebuild_leaderboards(conn)
+    for table, before, after in zip(LEADERBOARD_TABLES, incremental, read_leaderboards()):
+        assert not before.empty
+        pd.testing.assert_frame_equal(before, after, obj=table.name)
+
+
+# The staged pipeline stores exactly what fetching, cleaning and storing each topic in turn stores
+def test_staged_matches_serial(empty_store, clean_pool):
+    items = [{**item, 'topic': topic} for number, topic in enumerate(TOPICS)
+             for item in benchmark.synthetic_items(250, 0, number * 250)]
+    server, url = benchmark.start_mock_api(items)
+    tables = [schema.repositories, schema.rollups] + LEADERBOARD_TABLES
+    try:
+        scheduler = fetch.RequestScheduler(tokens=[])
+        for topic in TOPICS:
+            repo_df = pd.concat(list(fetch.fetch_repository_pages(topic, scheduler, url=url)), ignore_index=True)
+            store.store_data(clean.clean_repository_data(repo_df))
+        expected = read_tables(tables)
+        empty_store()
+
+        stats = pipeline.run_pipeline(TOPICS, fetch_workers=3, clean_workers=1, scheduler=fetch.RequestScheduler(tokens=[]),
+                                      url=url, batch_rows=100, pool=clean_pool)
+    finally:
+        server.shutdown()
+
+    assert not stats['errors']
+    assert stats['inserted'] == len(items)
+    for table, before, after in zip(tables, expected, read_tables(tables)):
+        pd.testing.assert_frame_equal(before, after, obj=table.name)
+
+
+# Run in a fresh interpreter per layout, since the layout is read at import: store 300 repositories,
+# each under one to three topics, and save what the explorer reads back
+def store_layout(path):
+    rng = random.Random(0)
+    items = list(benchmark.synthetic_items(300))
+    memberships = [rng.sample(TOPICS, rng.choice([1, 1, 2, 3])) for _ in items]
+    for topic in TOPICS:
+        records = [fetch.repository_record(item, topic) for item, topics in zip(items, memberships) if topic in topics]
+        store.store_data(clean.clean_repository_data(pd.DataFrame(records, columns=fetch.REPOSITORY_COLUMNS)), finalize=False)
+
+    frames = {'load_data': reads.load_data(), 'two_topics': reads.query_repositories(topic=TOPICS[:2], language='python')}
+    for name, df in frames.items():
+        df.astype({'Topic': str, 'Programming_Language': str, 'License_Type': str}).sort_values(store.KEY_COLUMNS) \
+            .reset_index(drop=True).to_pickle(os.path.join(path, f'{name}.pkl'))
+
+
+# The normalized layout's compatibility view returns the same rows as the flat table
+def test_normalized_view_matches_flat(tmp_path):
+    tests = os.path.dirname(os.path.abspath(__file__))
+    frames = {}
+    for layout in ['flat', 'normalized']:
+        workdir = tmp_path / layout
+        workdir.mkdir()
+        env = {**os.environ, 'STORAGE_LAYOUT': layout, 'TABLE_NAME': f'verify_{layout}', 'SNAPSHOT_DIR': str(workdir / 'snapshot'),
+               'DATABASE_URL': f'sqlite:///{workdir / "layout.db"}', 'PYTHONPATH': os.path.dirname(tests)}
+        subprocess.run([sys.executable, '-c', f'import test_verify; test_verify.store_layout({str(workdir)!r})'],
+                       env=env, cwd=tests, check=True)
+        frames[layout] = {name: pd.read_pickle(workdir / f'{name}.pkl') for name in ['load_data', 'two_topics']}
+
+    for name, flat in frames['flat'].items():
+        assert not flat.empty
+        pd.testing.assert_frame_equal(flat, frames['normalized'][name][flat.columns], obj=name)